@@ -1,17 +1,24 @@
-import json
 import pandas as pd
 import streamlit as st
 import base64
 import os
 import matplotlib.pyplot as plt
-from functools import reduce
-from operator import mul
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 from datetime import datetime
 import plotly.express as px  # For interactive charts
 import ijson
 import boto3  # Needed for loading history odds from S3
 import threading
+from modules.odds_io import read_frame
+from modules.snapshot_store import S3Store
+from modules.history_store import HistoryStore
+from modules.odds_history_db import tail_key
+from modules.stat_edge import stat_edge
+from modules.player_names import PlayerIndex
+from modules.stats_repository import StatsRepository
+from modules.kelly import kelly_stakes, american_to_prob
+from modules.play_query import ALL, PlayQuery, page, page_count
+from modules.parlay import best_parlays, RANK_EV, RANK_GROWTH
 
 
 DEBUG = False  # Set to False to disable debug prints.
@@ -80,11 +87,7 @@ def american_to_implied_prob(odds):
 def load_data():
     with st.spinner("Loading bets data..."):
         try:
-            with open("data/positive_ev_plays.json", "r") as file:
-                data = json.load(file)
-            if isinstance(data, dict):
-                data = [data]
-            df = pd.DataFrame(data)
+            df = read_frame("data/positive_ev_plays.parquet")
             df = df.rename(columns={
                 "unique_id": "unique_key",
                 "sport": "Sport",
@@ -99,8 +102,7 @@ def load_data():
                 "fair_american_odds": "NV Odds",
                 "fair_prob": "fair_prob",
                 "ev": "EV",
-                "market_width": "Market Width",
-                "aggregated_odds": "aggregated_odds"  # Retain aggregated odds data
+                "market_width": "Market Width"
             })
             
             df["Game"] = df["Away Team"] + " @ " + df["Home Team"]
@@ -108,96 +110,42 @@ def load_data():
                 df["Market"] = df["Market"].apply(lambda x: x.replace("_", " ").title() if pd.notnull(x) else x)
             selected_columns = [
                 "Sport", "Game", "unique_key", "Player/Team", "Market", "Book", "Outcome", "Line", "Odds", "NV Odds", "EV", 
-                "Market Width", "aggregated_odds", "fair_prob"
+                "Market Width", "fair_prob"
             ]
             df = df[selected_columns]
-            df["EV"] = df["EV"].apply(lambda x: f"{x:.2f}%" if pd.notnull(x) else x)
-            df["Line"] = df["Line"].apply(lambda x: f"{float(x):.1f}" if pd.notnull(x) else x)
+            # Keep typed columns (EV in percent, Line as a number); formatting happens at render time
+            # through PLAY_COLUMN_CONFIG and the grid's value formatters.
+            df = df.astype({"EV": "float64", "Line": "float64", "Market Width": "float64", "fair_prob": "float64"})
+            df = df.astype({"Sport": "category", "Book": "category", "Market": "category"})
             return df
         except Exception as e:
             st.error("Error loading data: " + str(e))
             return pd.DataFrame()
 
-@st.cache_data(ttl=60)
-def load_nba_stats():
-    with st.spinner("Loading NBA stats..."):
-        try:
-            with open("data/nba_stats_2025_pretty.json", "r") as f:
-                nba_data = json.load(f)
-            return pd.DataFrame(nba_data)
-        except Exception as e:
-            st.error("Error loading NBA stats data: " + str(e))
-            return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_nba_stats_2024():
+# Stats sources by name -> (sport, role, season) in the stats repository.
+STATS_SOURCES = {
+    "nba_2024": ("nba", "player", 2024),
+    "nba": ("nba", "player", 2025),
+    "mlb_batter_2024": ("mlb", "batter", 2024),
+    "mlb_batter": ("mlb", "batter", 2025),
+    "mlb_pitcher_2024": ("mlb", "pitcher", 2024),
+    "mlb_pitcher": ("mlb", "pitcher", 2025),
+    "nhl_2024": ("nhl", "skater", 2024),
+    "nhl": ("nhl", "skater", 2025),
+}
+
+@st.cache_resource
+def get_stats_repository():
+    # One repository per server process; it reloads a source only when its file changes on disk.
+    return StatsRepository()
+
+def get_player_index(source):
+    """PlayerIndex over one stats source (an empty one if the stats file can't be loaded)."""
     try:
-        with open("data/nba_stats_2024_pretty.json", "r") as f:
-            nba_data = json.load(f)
-        return pd.DataFrame(nba_data)
+        return get_stats_repository().index(*STATS_SOURCES[source])
     except Exception as e:
-        st.error("Error loading NBA 2024 stats: " + str(e))
-        return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_mlb_batter_stats_2024():
-    try:
-        with open("data/mlb_batter_stats_pretty.json", "r") as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error("Error loading MLB batter stats 2024: " + str(e))
-        return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_mlb_batter_stats_2025():
-    try:
-        with open("data/mlb_batter_stats_2025_pretty.json", "r") as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error("Error loading MLB batter stats 2025: " + str(e))
-        return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_mlb_pitcher_stats_2024():
-    try:
-        with open("data/mlb_pitcher_stats_pretty.json", "r") as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error("Error loading MLB pitcher stats 2024: " + str(e))
-        return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_mlb_pitcher_stats_2025():
-    try:
-        with open("data/mlb_pitcher_stats_2025_pretty.json", "r") as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error("Error loading MLB pitcher stats 2025: " + str(e))
-        return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_nhl_skater_stats_2024():
-    try:
-        with open("data/nhl_skater_stats_2024_pretty.json", "r") as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error("Error loading NHL skater stats 2024: " + str(e))
-        return pd.DataFrame()
-
-@st.cache_data(ttl=60)
-def load_nhl_skater_stats_2025():
-    try:
-        with open("data/nhl_skater_stats_2025_pretty.json", "r") as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error("Error loading NHL skater stats 2025: " + str(e))
-        return pd.DataFrame()
+        st.error(f"Error loading {source} stats: {e}")
+        return PlayerIndex(pd.DataFrame())
 
 # Define the function to get AWS credentials when needed.
 def get_aws_credentials():
@@ -218,35 +166,23 @@ def get_s3_client():
                         region_name=aws_default_region)
 
 
+@st.cache_resource
+def get_history_store(_s3):
+    # One store per server process: its disk cache and index are shared by every session and rerun.
+    return HistoryStore(S3Store(_s3, "betversa-odds-data"))
+
 def load_history_odds_from_s3():
-    bucket = "betversa-odds-data"
-    prefix = "snapshots/"
-    
+    """The line-movement HistoryStore, refreshed incrementally from S3, or None without AWS credentials."""
     s3 = get_s3_client()  # This call now happens at runtime
     if s3 is None:
-        return {}
-    
-    history = {}
-    paginator = s3.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
-    
-    for page in pages:
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            parts = key.split("/")
-            if len(parts) < 3:
-                continue  # Not the expected structure
-            unique_key = parts[1]
-            try:
-                response = s3.get_object(Bucket=bucket, Key=key)
-                content = response["Body"].read().decode("utf-8")
-                snapshot = json.loads(content)
-            except Exception as e:
-                st.error(f"Error processing snapshot {key}: {e}")
-                continue
-            snapshot["timestamp"] = obj["LastModified"].isoformat()
-            history.setdefault(unique_key, []).append(snapshot)
-    return history
+        return None
+
+    store = get_history_store(s3)
+    try:
+        store.refresh()
+    except Exception as e:
+        st.error(f"Error loading line movement snapshots: {e}")
+    return store
 
 
 @st.cache_data(ttl=60)
@@ -261,47 +197,55 @@ def compute_interactive_graph(trends_data):
     return fig
 
 
+BOOK_PRICE_COLUMNS = ["bookmaker", "price", "point", "description"]
+
+@st.cache_data(ttl=60)
+def load_book_prices():
+    """Every book's price for each play (written by positiveev.py), indexed and sorted by unique_id."""
+    try:
+        prices = read_frame("data/book_prices.parquet")
+        return prices.set_index("unique_id").sort_index()
+    except Exception as e:
+        st.error("Error loading book prices: " + str(e))
+        return pd.DataFrame(columns=BOOK_PRICE_COLUMNS, index=pd.Index([], name="unique_id"))
+
+def get_book_prices(unique_key):
+    """The book prices of one play, as bookmaker / price / point / description rows."""
+    prices = load_book_prices()
+    return prices.loc[unique_key:unique_key, BOOK_PRICE_COLUMNS].reset_index(drop=True)
+
+@st.cache_resource(ttl=60)
+def get_play_query():
+    # Filter groups over the loaded plays, rebuilt when the plays cache expires.
+    return PlayQuery(load_data())
+
+# Display formats for the play columns (st.dataframe column configs).
+PLAY_COLUMN_CONFIG = {
+    "Line": st.column_config.NumberColumn("Line", format="%.1f"),
+    "Odds": st.column_config.NumberColumn("Odds", format="%d"),
+    "NV Odds": st.column_config.NumberColumn("NV Odds", format="%d"),
+    "EV": st.column_config.NumberColumn("EV", format="%.2f%%"),
+    "Market Width": st.column_config.NumberColumn("Market Width", format="%.1f"),
+}
+
 # Load our main data
 df_full = load_data()
 df_unique = df_full.drop_duplicates(subset=["unique_key"])
 merged_ev = pd.merge(df_full, df_unique[["unique_key", "NV Odds", "EV"]], on="unique_key", how="left")
 
-def compute_kelly_amount(sportsbook_odds, fair_prob, bankroll, multiplier):
-    """
-    Compute the Kelly amount using the formula: (B * P - (1-P)) / B,
-    where:
-      B = (decimal odds - 1),
-      P = fair_prob (a decimal value between 0 and 1),
-      Q = 1-P.
-    
-    The Kelly Amount is then: bankroll * multiplier * Kelly fraction.
-    If the Kelly fraction is negative, return 0.
-    """
-    # Convert American odds to decimal odds
-    d = american_to_decimal(sportsbook_odds)
-    if d is None or (d - 1) == 0:
-        return 0.0
-    b = d - 1
-    kelly_fraction = (b * fair_prob - (1 - fair_prob)) / b
-    if kelly_fraction < 0:
-        kelly_fraction = 0
-    kelly_dollar = bankroll * multiplier * kelly_fraction
-    return f"${kelly_dollar:,.2f}"
-
-
 ###############################################################################
 # Helper: Extract tail from unique key (everything after the first underscore)
 ###############################################################################
-def tail_key(u_key):
-    parts = u_key.split("_", 1)
-    return parts[1].lower() if len(parts) == 2 else u_key.lower()
-
 ###############################################################################
 # Formatting Functions for Stats
 ###############################################################################
+def stat_float(value):
+    # Stats are stored as float32; going through the shortest repr keeps 0.285 from showing as 0.2849999964.
+    return float(str(value))
+
 def format_nba_stat(col, value):
     try:
-        value = float(value)
+        value = stat_float(value)
     except:
         return value
     if col in ["FG%", "3P%"]:
@@ -311,7 +255,7 @@ def format_nba_stat(col, value):
 
 def format_mlb_stat(col, value):
     try:
-        value = float(value)
+        value = stat_float(value)
     except:
         return value
     if col in ["AVG", "OPS"]:
@@ -324,7 +268,7 @@ def format_mlb_stat(col, value):
 
 def format_nhl_stat(col, value):
     try:
-        value = float(value)
+        value = stat_float(value)
     except:
         return value
     if col == "GP":
@@ -575,15 +519,7 @@ def show_overview():
     
     search_query = st.text_input("Search bets (by team, player, or market):", "")
     
-    def is_positive(percent_str):
-        try:
-            return float(percent_str.replace("%", "")) > 0
-        except:
-            return False
-
-    filtered = df_unique[(df_full["EV"].apply(is_positive)) & (df_full["EV"].apply(is_positive))]
-    filtered["EV"] = filtered["EV"].apply(lambda x: f"{float(x):.2f}%" if isinstance(x, (float, int)) else x)
-    filtered["NV Odds"] = filtered["NV Odds"].astype(str)
+    filtered = df_unique[df_unique["EV"] > 0]
 
     allowed_markets = ("player", "batter", "pitcher")
     filtered = filtered[filtered["Market"].str.lower().str.startswith(allowed_markets)]
@@ -595,68 +531,15 @@ def show_overview():
             filtered["Market"].str.contains(search_query, case=False, na=False)
         ]
     
-    nba_stats_df = load_nba_stats()
-    def stat_condition(row):
-        sport = row["Sport"].lower()
-        market = row["Market"].lower()
-        outcome = row["Outcome"].lower()
-        try:
-            line_value = float(row["Line"])
-        except Exception:
-            return False
-        if sport == "nba" and market.startswith("player"):
-            stats_row = nba_stats_df[nba_stats_df["Player"] == row["Player/Team"]]
-            if stats_row.empty:
-                return False
-            stats_row = stats_row.iloc[0]
-            if "points rebounds assists" in market or ("points" in market and "rebounds" in market and "assists" in market):
-                stat_value = stats_row["PTS"] + stats_row["TRB"] + stats_row["AST"]
-            elif "points" in market:
-                stat_value = stats_row["PTS"]
-            elif "rebounds" in market:
-                stat_value = stats_row["TRB"]
-            elif "assists" in market:
-                stat_value = stats_row["AST"]
-            elif "threes" in market:
-                stat_value = stats_row.get("3P", None)
-            else:
-                stat_value = None
-            if stat_value is None:
-                return False
-            return (stat_value > line_value) if outcome.startswith("over") else (stat_value < line_value)
-        elif sport == "mlb":
-            if market.startswith("batter"):
-                mlb_batter_df = load_mlb_batter_stats_2025()
-                stats_row = mlb_batter_df[mlb_batter_df["Player"] == row["Player/Team"]]
-                if stats_row.empty:
-                    return False
-                stat_value = stats_row.iloc[0]["H"]
-                return (stat_value > line_value) if outcome.startswith("over") else (stat_value < line_value)
-            elif market.startswith("pitcher"):
-                mlb_pitcher_df = load_mlb_pitcher_stats_2025()
-                stats_row = mlb_pitcher_df[mlb_pitcher_df["Player"] == row["Player/Team"]]
-                if stats_row.empty:
-                    return False
-                stat_value = stats_row.iloc[0]["SO"]
-                return (stat_value > line_value) if outcome.startswith("over") else (stat_value < line_value)
-            else:
-                return True
-        elif sport == "nhl" and market.startswith("player"):
-            nhl_df = load_nhl_skater_stats_2025()
-            stats_row = nhl_df[nhl_df["Player"] == row["Player/Team"]]
-            if stats_row.empty:
-                return False
-            stat_value = stats_row.iloc[0]["SOG"]
-            return (stat_value > line_value) if outcome.startswith("over") else (stat_value < line_value)
-        else:
-            return True
-
-    filtered = filtered[filtered.apply(stat_condition, axis=1)]
+    # Keep props where the player's season average is on the bet's side of the line.
+    stats_indexes = {source: (lambda source=source: get_player_index(source)) for source in ("nba", "mlb_batter", "mlb_pitcher", "nhl")}
+    filtered = filtered[stat_edge(filtered, stats_indexes)]
     
     st.dataframe(
         filtered[["Sport", "Game", "Player/Team", "Market", "Book", "Outcome", "Line", "Odds", "NV Odds", "EV", "Market Width"]]
         .reset_index(drop=True),
-        height=500
+        height=500,
+        column_config=PLAY_COLUMN_CONFIG
     )
 
 def show_ev_page():
@@ -669,77 +552,85 @@ def show_ev_page():
         </p>
     """, unsafe_allow_html=True)
     
-    # Work with a copy of the full data.
-    merged_ev = df_full.copy()
+    # Filters are lookups into the precomputed (Sport, Book, Market) groups.
+    query = get_play_query()
     
     # Create three columns for the filters.
     filter_cols = st.columns(3)
 
     with filter_cols[0]:
-        sports_options = ["All"] + sorted(merged_ev["Sport"].dropna().unique().tolist())
+        sports_options = [ALL] + query.options["Sport"]
         selected_sport = st.selectbox("Select Sport:", options=sports_options, index=0)
 
     with filter_cols[1]:
-        books_options = ["All"] + sorted(merged_ev["Book"].dropna().unique().tolist())
+        books_options = [ALL] + query.options["Book"]
         selected_book = st.selectbox("Select Bookmaker:", options=books_options, index=0)
 
     with filter_cols[2]:
-        markets_options = ["All"] + sorted(merged_ev["Market"].dropna().unique().tolist())
+        markets_options = [ALL] + query.options["Market"]
         selected_market = st.selectbox("Select Market:", options=markets_options, index=0)
 
-    # Place additional inputs (bankroll and Kelly multiplier) in another row.
-    input_cols = st.columns(2)
+    # Place additional inputs (bankroll, Kelly multiplier and sizing) in another row.
+    input_cols = st.columns(4)
     with input_cols[0]:
         bankroll = st.number_input("Enter your bankroll ($):", min_value=0.0, value=1000.0, step=10.0)
     with input_cols[1]:
         kelly_multiplier_option = st.selectbox("Select Kelly Multiplier:", options=["1", "1/2", "1/4"], index=0)
+    with input_cols[2]:
+        max_bet_pct = st.number_input("Max bet (% of bankroll):", min_value=0.0, max_value=100.0, value=100.0, step=1.0)
+    with input_cols[3]:
+        sizing_mode = st.selectbox("Kelly Sizing:", options=["Independent", "Simultaneous"], index=0,
+                                   help="Simultaneous sizes the sides of one market line (and one side offered at "
+                                        "several books) together, maximizing expected log growth over which side "
+                                        "wins, and keeps the total stake within the bankroll. Bets on different "
+                                        "markets are still sized on their own.")
     kelly_multiplier = {"1": 1.0, "1/2": 0.5, "1/4": 0.25}.get(kelly_multiplier_option, 1.0)
 
     
-    # Filter the DataFrame based on the drop-down selections.
-    if selected_sport != "All":
-        merged_ev = merged_ev[merged_ev["Sport"] == selected_sport]
-    if selected_book != "All":
-        merged_ev = merged_ev[merged_ev["Book"] == selected_book]
-    if selected_market != "All":
-        merged_ev = merged_ev[merged_ev["Market"] == selected_market]
+    # Only the rows matching the drop-down selections are copied out of the cached frame.
+    merged_ev = query.select(selected_sport, selected_book, selected_market)
     
     # Load history records (if needed in later interactions).
-    history_records = load_history_odds_from_s3()
+    history = load_history_odds_from_s3()
 
     
-    # Update the EV formatting: show as a decimal (e.g., "2.34").
-    merged_ev["EV"] = merged_ev["EV"].apply(lambda x: x if isinstance(x, str) else f"{x:.2f}%")
-
-
-    merged_ev["NV Odds"] = merged_ev["NV Odds"].astype(str)
-    
-    # Compute Kelly Amount using fair_prob.
-    merged_ev["Kelly Amount"] = merged_ev.apply(
-        lambda row: compute_kelly_amount(row["Odds"], row["fair_prob"], bankroll, kelly_multiplier),
-        axis=1
-    )
-    merged_ev["Kelly Amount"] = merged_ev.apply(
-        lambda row: compute_kelly_amount(
-            row["Odds"],
-            row.get("fair_prob", american_to_implied_prob(row["NV Odds"])),
-            bankroll,
-            kelly_multiplier
-        ),
-        axis=1
+    # Kelly stakes for the whole filtered frame in one pass (fair_prob, else the no-vig odds' implied
+    # probability). The column stays numeric so the grid sorts it; the grid formats it as dollars.
+    win_prob = merged_ev["fair_prob"].fillna(pd.Series(american_to_prob(merged_ev["NV Odds"]), index=merged_ev.index))
+    sets = outcomes = None
+    if sizing_mode == "Simultaneous":
+        # At most one side of a market line can win: same game, market, player and |line|.
+        sets = (merged_ev["unique_key"].str.split("_", n=1).str[0] + "|" + merged_ev["Market"].astype(str) + "|"
+                + merged_ev["Player/Team"].fillna("").astype(str) + "|" + merged_ev["Line"].abs().astype(str))
+        outcomes = merged_ev["Outcome"]
+    merged_ev["Kelly Amount"] = kelly_stakes(
+        merged_ev["Odds"], win_prob, bankroll,
+        multiplier=kelly_multiplier, cap=max_bet_pct / 100.0, sets=sets, outcomes=outcomes,
     )
 
     
+    # Sort and page server-side: the grid only receives the visible page of rows.
+    page_cols = st.columns(3)
+    with page_cols[0]:
+        sort_column = st.selectbox("Sort by:", options=["EV", "Kelly Amount", "Odds", "Market Width"], index=0)
+    with page_cols[1]:
+        page_size = st.selectbox("Rows per page:", options=[50, 100, 250], index=1)
+    with page_cols[2]:
+        pages = page_count(len(merged_ev), page_size)
+        page_number = st.number_input(f"Page (of {pages}):", min_value=1, max_value=pages, value=1, step=1)
+    merged_ev = merged_ev.sort_values(sort_column, ascending=False, kind="stable")
+    st.caption(f"Showing {min(len(merged_ev), (page_number - 1) * page_size + 1)}–"
+               f"{min(len(merged_ev), page_number * page_size)} of {len(merged_ev)} plays")
+
     # Prepare the DataFrame for AgGrid.
     ev_display_cols = [
         "Sport", "Game", "Player/Team", "Market", "Book", "Outcome", "Line",
-        "Odds", "NV Odds", "EV", "Market Width", "Kelly Amount", "aggregated_odds", "fair_prob", "unique_key"
+        "Odds", "NV Odds", "EV", "Market Width", "Kelly Amount", "fair_prob", "unique_key"
     ]
-    ev_display = merged_ev[ev_display_cols].reset_index(drop=True)
+    ev_display = page(merged_ev, page_number, page_size)[ev_display_cols].reset_index(drop=True)
     ev_display.index = [''] * len(ev_display)
     
     # Build AgGrid options.
-    from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
     gb = GridOptionsBuilder.from_dataframe(ev_display)
     gb.configure_default_column(resizable=True, autoWidth=True)
     # Optional: if you configured specific columns earlier, re-apply autoWidth
@@ -750,9 +641,12 @@ def show_ev_page():
     gb.configure_grid_options(domLayout='normal')
 
     # Hide columns that should not be displayed but are needed in the underlying data.
-    gb.configure_column("aggregated_odds", hide=True)
     gb.configure_column("unique_key", hide=True)
     gb.configure_column("fair_prob", hide=True)
+    # Numbers stay numeric (so the grid sorts them) and are formatted with aggrid's built-in column types.
+    gb.configure_column("Line", type=["numericColumn", "customNumericFormat"], precision=1)
+    gb.configure_column("EV", header_name="EV (%)", type=["numericColumn", "customNumericFormat"], precision=2)
+    gb.configure_column("Kelly Amount", type=["numericColumn", "customCurrencyFormat"], custom_currency_symbol="$")
     grid_options = gb.build()
     
     # Display AgGrid.
@@ -778,13 +672,14 @@ def show_ev_page():
     
     if selected_row:
         selected_key = selected_row.get("unique_key")
-        matched_records = history_records.get(selected_key, [])
+        matched_records = history.get(selected_key) if history is not None else []
         st.write("Matched Records:", matched_records)
     else:
         st.write("No row selected.")
     
-    # Use the aggregated odds for the odds breakdown if available.
-    if selected_row is not None and "aggregated_odds" in selected_row and selected_row["aggregated_odds"]:
+    # The selected play's book prices, joined from the book-prices table, drive the odds breakdown.
+    book_prices = get_book_prices(selected_row["unique_key"]) if selected_row and selected_row.get("unique_key") else pd.DataFrame()
+    if not book_prices.empty:
         tabs = st.tabs(["Details", "Line Movement"])
         with tabs[1]:
             debug_chart = st.checkbox("Show chart debug info", value=False)
@@ -792,49 +687,16 @@ def show_ev_page():
             bet_tail = tail_key(pos_ev_unique)
             if debug_chart:
                 st.write("Debug: Bet unique_key tail:", bet_tail)
-            trends_data = []
-            ev_keys = set(df_full["unique_key"].tolist())
-            ev_key_tails = {key.split("_", 1)[-1].lower() for key in ev_keys}
-            history_records = load_history_odds_from_s3()
-            # Instead of iterating over everything, get matched records for the selected key.
-            matched_records = history_records.get(selected_key, [])
-            matching_count = 0
-            for hist_key, rec_list in history_records.items():
-                hist_tail = tail_key(hist_key)
-                if bet_tail == hist_tail:
-                    matching_count += 1
-                    if debug_chart:
-                        st.write("Debug: Found matching history key:", hist_key)
-                    for rec in rec_list:
-                        if debug_chart:
-                            st.write("DEBUG: Raw record:", rec)
-                        ts_str = rec.get("timestamp", "")
-                        if ts_str.endswith("Z") and "+00:00" in ts_str:
-                            ts_str = ts_str.replace("+00:00Z", "+00:00")
-                        try:
-                            ts = pd.to_datetime(ts_str)
-                            if ts.tzinfo is None:
-                                ts = ts.tz_localize("UTC")
-                            ts = ts.tz_convert("US/Central")
-                        except Exception as e:
-                            if debug_chart:
-                                st.write("Debug: Timestamp conversion error:", e)
-                            ts = None
-                        for entry in rec.get("bookmakers", []):
-                            if debug_chart:
-                                st.write("DEBUG: Bookmakers data from record:", entry)
-                            bk = entry.get("bookmaker", {}).get("title", "")
-                            offered = entry.get("offered_odds")
-                            trends_data.append({"Time": ts, "Odds": offered, "Book": bk})
+            if history is not None:
+                trends_df = history.chart_data(bet_tail)
+            else:
+                trends_df = pd.DataFrame(columns=["Time", "Odds", "Book"])
             if debug_chart:
-                st.write("Debug: Matching records count:", matching_count)
-                if trends_data:
+                st.write("Debug: Matching snapshot rows:", len(trends_df))
+                if not trends_df.empty:
                     st.write("Debug: Matched snapshots:")
-                    st.dataframe(pd.DataFrame(trends_data).sort_values("Time"))
-            if trends_data:
-                trends_df = pd.DataFrame(trends_data)
-                if not pd.api.types.is_datetime64_any_dtype(trends_df["Time"]):
-                    trends_df["Time"] = pd.to_datetime(trends_df["Time"], errors='coerce')
+                    st.dataframe(trends_df)
+            if not trends_df.empty:
                 fig = px.line(trends_df, x="Time", y="Odds", color="Book", markers=True,
                               title="Line Movement by Sportsbook")
                 st.plotly_chart(fig, use_container_width=True)
@@ -843,7 +705,7 @@ def show_ev_page():
         with tabs[0]:
             col_left, col_right = st.columns([1, 1.5])
             with col_left:
-                odds_df = pd.DataFrame(selected_row["aggregated_odds"])
+                odds_df = book_prices
                 if DEBUG:
                     st.write("DEBUG: Raw aggregated odds", odds_df)
                 if "player" in odds_df.columns and "point" in odds_df.columns and "Line" in selected_row:
@@ -866,7 +728,7 @@ def show_ev_page():
                     "espnbet": "ESPN BET",
                     "williamhill_us": "Caesars",
                     "betrivers": "BetRivers",
-                    "betonline": "Bet Online",
+                    "betonlineag": "Bet Online",
                     "lowvig": "Low Vig",
                     "pinnacle": "Pinnacle",
                     "fanduel": "FanDuel"
@@ -904,12 +766,8 @@ def show_ev_page():
                 stats_last = pd.DataFrame()
                 stats_this = pd.DataFrame()
                 if sport == "nba" and market.startswith("player"):
-                    name_mapping = {"Bub Carrington": "Carlton Carrington"}
-                    canonical_player = name_mapping.get(selected_player, selected_player)
-                    nba_last = load_nba_stats_2024()
-                    nba_this = load_nba_stats()
-                    stats_last = nba_last[nba_last["Player"] == canonical_player].copy()
-                    stats_this = nba_this[nba_this["Player"] == canonical_player].copy()
+                    stats_last = get_player_index("nba_2024").lookup(selected_player)
+                    stats_this = get_player_index("nba").lookup(selected_player)
                     for df in [stats_last, stats_this]:
                         if not df.empty:
                             for col in df.columns:
@@ -918,10 +776,8 @@ def show_ev_page():
                                 df[col] = format_nba_stat(col, df[col].iloc[0])
                 elif sport == "mlb":
                     if market.startswith("batter"):
-                        mlb_last = load_mlb_batter_stats_2024()
-                        mlb_this = load_mlb_batter_stats_2025()
-                        stats_last = mlb_last[mlb_last["Player"] == selected_player].copy() if not mlb_last.empty else pd.DataFrame()
-                        stats_this = mlb_this[mlb_this["Player"] == selected_player].copy() if not mlb_this.empty else pd.DataFrame()
+                        stats_last = get_player_index("mlb_batter_2024").lookup(selected_player)
+                        stats_this = get_player_index("mlb_batter").lookup(selected_player)
                         for df in [stats_last, stats_this]:
                             if not df.empty:
                                 for col in df.columns:
@@ -929,10 +785,8 @@ def show_ev_page():
                                         continue
                                     df[col] = format_mlb_stat(col, df[col].iloc[0])
                     elif market.startswith("pitcher"):
-                        mlb_last = load_mlb_pitcher_stats_2024()
-                        mlb_this = load_mlb_pitcher_stats_2025()
-                        stats_last = mlb_last[mlb_last["Player"] == selected_player].copy() if not mlb_last.empty else pd.DataFrame()
-                        stats_this = mlb_this[mlb_this["Player"] == selected_player].copy() if not mlb_this.empty else pd.DataFrame()
+                        stats_last = get_player_index("mlb_pitcher_2024").lookup(selected_player)
+                        stats_this = get_player_index("mlb_pitcher").lookup(selected_player)
                         for df in [stats_last, stats_this]:
                             if not df.empty:
                                 for col in df.columns:
@@ -940,10 +794,8 @@ def show_ev_page():
                                         continue
                                     df[col] = format_mlb_stat(col, df[col].iloc[0])
                 elif sport == "nhl" and market.startswith("player"):
-                    nhl_last = load_nhl_skater_stats_2024()
-                    nhl_this = load_nhl_skater_stats_2025()
-                    stats_last = nhl_last[nhl_last["Player"] == selected_player].copy() if not nhl_last.empty else pd.DataFrame()
-                    stats_this = nhl_this[nhl_this["Player"] == selected_player].copy() if not nhl_this.empty else pd.DataFrame()
+                    stats_last = get_player_index("nhl_2024").lookup(selected_player)
+                    stats_this = get_player_index("nhl").lookup(selected_player)
                     for df in [stats_last, stats_this]:
                         if not df.empty:
                             for col in df.columns:
@@ -981,42 +833,53 @@ def show_parlay():
     selected_sports = st.multiselect("Select Sports (leave empty for all):", options=available_sports)
     available_books = sorted(df_full["Book"].unique())
     selected_books = st.multiselect("Select Sportsbooks (leave empty for all):", options=available_books)
+    option_cols = st.columns(3)
+    with option_cols[0]:
+        min_odds = st.number_input("Min combined odds (American, optional):", value=None, step=50,
+                                   help="Leave empty (or between -100 and +100) for no limit.")
+    with option_cols[1]:
+        max_odds = st.number_input("Max combined odds (American, optional):", value=None, step=50,
+                                   help="Leave empty (or between -100 and +100) for no limit.")
+    with option_cols[2]:
+        rank_option = st.selectbox("Rank parlays by:", options=["EV", "Kelly Growth"], index=0)
+    option_cols = st.columns(3)
+    with option_cols[0]:
+        one_per_option = st.selectbox("One leg per:", options=["Game", "Market"], index=0,
+                                      help="Game avoids correlated legs entirely; Market allows several markets from one game.")
+    with option_cols[1]:
+        top_k = st.number_input("Parlays to show:", min_value=1, max_value=10, value=3, step=1)
+    with option_cols[2]:
+        bankroll = st.number_input("Bankroll ($):", min_value=0.0, value=1000.0, step=10.0)
+    same_book = st.checkbox("All legs at one sportsbook", value=True)
     build_clicked = st.button("Build Parlay", key="build_parlay", help="Click to generate a parlay with the selected criteria.")
     if build_clicked:
-        parlay_df = df_full.copy()
+        parlay_df = df_full
         if selected_sports:
             parlay_df = parlay_df[parlay_df["Sport"].isin(selected_sports)]
         if selected_books:
             parlay_df = parlay_df[parlay_df["Book"].isin(selected_books)]
-        if len(parlay_df) < legs:
+        # The event id is the unique_key prefix; legs from one event are correlated.
+        parlay_df = parlay_df.assign(event=parlay_df["unique_key"].str.split("_", n=1).str[0]).reset_index(drop=True)
+        parlays = best_parlays(
+            parlay_df, int(legs), top_k=int(top_k),
+            rank_by=RANK_GROWTH if rank_option == "Kelly Growth" else RANK_EV,
+            one_per="event" if one_per_option == "Game" else "market",
+            same_book=same_book, min_odds=min_odds, max_odds=max_odds,
+        )
+        if not parlays:
             st.error("Not enough bets available to build a parlay with the selected criteria.")
-        else:
-            parlay_df["EV_float"] = parlay_df["EV"].apply(lambda x: float(x.replace("%", "")) / 100.0 if pd.notnull(x) else 0)
-            parlay_df = parlay_df.sort_values("EV_float", ascending=False)
-            selected_bets = parlay_df.head(legs)
-            try:
-                final_combo_decimal = reduce(mul, [american_to_decimal(x) for x in selected_bets["NV Odds"] if x is not None], 1)
-                final_combo_american = decimal_to_american(final_combo_decimal)
-            except Exception:
-                final_combo_american = None
-            try:
-                no_vig_decimals = [american_to_decimal(x) for x in selected_bets["NV Odds"] if x is not None]
-                parlay_decimal_no_vig = reduce(mul, no_vig_decimals, 1)
-                parlay_american_no_vig = decimal_to_american(parlay_decimal_no_vig)
-            except Exception:
-                parlay_american_no_vig = None
-
-            bet_amount = 250
-
-            display_columns = ["Sport", "Game", "Player/Team", "Market", "Book", "Outcome", "Line", "Odds", "NV Odds", "EV", "Market Width"]
-            temp = selected_bets[display_columns].reset_index(drop=True)
+        display_columns = ["Sport", "Game", "Player/Team", "Market", "Book", "Outcome", "Line", "Odds", "NV Odds", "EV", "Market Width"]
+        for number, parlay in enumerate(parlays, start=1):
+            st.markdown(f"#### Parlay {number}", unsafe_allow_html=True)
+            temp = parlay_df.iloc[parlay["rows"]][display_columns].reset_index(drop=True)
             temp.index = [''] * len(temp)
-            st.dataframe(temp, height=400)
+            st.dataframe(temp, height=min(400, 38 + 35 * len(temp)), column_config=PLAY_COLUMN_CONFIG)
 
-            st.markdown("#### Parlay Summary", unsafe_allow_html=True)
-            st.write(f"**Combined American Odds:** {final_combo_american if final_combo_american is not None else 'N/A'}")
-            st.write(f"**No-Vig American Odds:** {parlay_american_no_vig if parlay_american_no_vig is not None else 'N/A'}")
-            st.write(f"**Bet Amount (Quarter Kelly):** ${bet_amount}")
+            bet_amount = bankroll * 0.25 * parlay["kelly"]
+            st.write(f"**Combined American Odds:** {decimal_to_american(parlay['decimal'])}")
+            st.write(f"**No-Vig American Odds:** {decimal_to_american(1 / parlay['prob'])}")
+            st.write(f"**Parlay EV:** {parlay['ev'] * 100:.2f}%")
+            st.write(f"**Bet Amount (Quarter Kelly):** ${bet_amount:,.2f}")
             
 def show_about():
     st.markdown("<div class='custom-header'>About BetVersa</div>", unsafe_allow_html=True)
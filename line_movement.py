@@ -1,33 +1,29 @@
 import os
-import json
 import boto3
 from datetime import datetime, timezone
+from modules.odds_io import iter_events
+from modules.snapshot_store import RUN_FORMAT, LocalStore, S3Store, snapshot_frame, write_snapshot
+from modules import odds_history_db
 
 # Configuration
-JSON_FILE = "data/all_odds.json"
+JSON_FILE = "data/all_odds.json.gz"
 BUCKET_NAME = "betversa-odds-data"
-SNAPSHOT_PREFIX = "snapshots/"
-
-# Initialize S3 client (boto3 will automatically pick up AWS credentials from the environment)
-s3 = boto3.client("s3")
+# Set SNAPSHOT_DIR to write snapshots to a local directory instead of S3.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+# Also load each run into the SQLite history store, for a deployment whose app shares that database
+# file. Off unless ODDS_HISTORY_DB is set: on the scheduled runner the file would be thrown away with
+# the job, and the app loads the uploaded runs itself.
+WRITE_HISTORY_DB = bool(os.getenv("ODDS_HISTORY_DB"))
 
 def load_odds_from_json(json_file):
-    """Load odds data from the provided JSON file."""
-    with open(json_file, "r") as f:
-        return json.load(f)
+    """Stream events from the provided JSON file one at a time."""
+    return iter_events(json_file)
 
-def upload_snapshot_to_s3(unique_key, snapshot_data):
-    """Upload a snapshot to S3 using a key composed from the unique key and a timestamp."""
-    # Create a compact timestamp string (ISO formatted without colons)
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    s3_key = f"{SNAPSHOT_PREFIX}{unique_key}/{timestamp}.json"
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=s3_key,
-        Body=json.dumps(snapshot_data),
-        ContentType="application/json"
-    )
-    print(f"Uploaded snapshot for {unique_key} to {s3_key}")
+def get_snapshot_store():
+    if SNAPSHOT_DIR:
+        return LocalStore(SNAPSHOT_DIR)
+    # boto3 will automatically pick up AWS credentials from the environment.
+    return S3Store(boto3.client("s3"), BUCKET_NAME)
 
 def main():
     try:
@@ -36,8 +32,9 @@ def main():
         print("Error loading JSON file:", e)
         return
 
-    # Create a dictionary to group snapshots by unique key.
-    snapshots = {}
+    # One row per outcome and bookmaker; the whole run is written as a single file per sport.
+    run_time = datetime.now(timezone.utc).replace(microsecond=0)
+    rows = []
 
     for event in events:
         event_id = event.get("id")
@@ -64,35 +61,37 @@ def main():
 
                     # Create the unique key based on your logic.
                     unique_key = f"{event_id}_{market_key.upper()}_{outcome_name}_{outcome_desc}_{outcome_point_str}"
-
-                    # If this unique key isn’t already in our snapshots dictionary, create a new entry.
-                    if unique_key not in snapshots:
-                        snapshots[unique_key] = {
-                            "unique_key": unique_key,
-                            "event_id": event_id,
-                            "market_key": market_key,
-                            "bet_details": {
-                                "outcome_name": outcome_name,
-                                "outcome_description": outcome_desc,
-                                "point": outcome_point
-                            },
-                            "sportsbook_odds": [],   # We'll append all odds here
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                    # Append this bookmaker’s odds to the aggregated list for the unique key.
-                    snapshots[unique_key]["sportsbook_odds"].append({
+                    rows.append({
+                        "unique_key": unique_key,
+                        "event_id": event_id,
+                        "sport": event.get("sport_label"),
+                        "market_key": market_key,
+                        "outcome_name": outcome_name,
+                        "outcome_description": outcome_desc,
+                        "point": outcome_point,
                         "bookmaker": bookmaker_title,
-                        "price": outcome.get("price")
+                        "price": outcome.get("price"),
                     })
 
-    # Now upload one snapshot per unique key
-    for unique_key, snapshot_data in snapshots.items():
-        try:
-            upload_snapshot_to_s3(unique_key, snapshot_data)
-        except Exception as e:
-            print(f"Error uploading snapshot for {unique_key}: {e}")
+    frame = snapshot_frame(rows, run_time)
+    keys = []
+    try:
+        keys = write_snapshot(get_snapshot_store(), frame, run_time)
+        print(f"Uploaded {len(frame)} snapshot rows in {len(keys)} files: {', '.join(keys)}")
+    except Exception as e:
+        print(f"Error uploading snapshot: {e}")
 
-    print("All aggregated snapshots uploaded to S3.")
+    if not WRITE_HISTORY_DB:
+        return
+    # Also record the run in the local time-series store; the uploaded files are marked as loaded so
+    # an app sharing this database does not fetch them again.
+    try:
+        conn = odds_history_db.create()
+        odds_history_db.insert_snapshot(conn, frame, files=keys, run=run_time.strftime(RUN_FORMAT))
+        conn.close()
+        print(f"Stored {len(frame)} rows in {odds_history_db.DB_FILE}")
+    except Exception as e:
+        print(f"Error writing {odds_history_db.DB_FILE}: {e}")
 
 if __name__ == "__main__":
     main()
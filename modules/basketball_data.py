@@ -1,28 +1,29 @@
-import urllib.request, urllib.parse, urllib.error
-from bs4 import BeautifulSoup
 import re
 import pandas as pd
-from fuzzywuzzy import fuzz
-from io import StringIO
-import unicodedata
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from modules.player_names import normalize_name, player_key, match_names
+from modules.html_cache import fetch, DEFAULT_TTL_SECONDS
+from modules.html_tables import parse, find_table, table_frame, read_table
 
 pd.options.mode.chained_assignment = None 
 
-def normalize_name(name):
-    """Normalize player names by removing accents and extra spaces."""
-    normalized = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('utf-8')
-    return normalized.strip()
+# Seasons loaded concurrently by get_data.multiple; requests to each host are still paced by modules/html_cache.py.
+MAX_SEASON_WORKERS = 4
+
+def season_ttl(season):
+    """Cache TTL for a season's pages: finished seasons no longer change, so they never expire."""
+    today = date.today()
+    current_season = today.year + 1 if today.month >= 10 else today.year
+    return None if int(season) < current_season else DEFAULT_TTL_SECONDS
 
 class awards:
     @staticmethod
     def mvp(season):
         season = str(season)
         url = 'https://www.basketball-reference.com/awards/mvp.html'
-        html = urllib.request.urlopen(url)
-        soup = BeautifulSoup(html, 'html.parser')
-        table_html = str(soup.findAll('table', id='mvp_NBA')[0])
-        df = pd.read_html(StringIO(table_html))[0]
-        df.columns = df.columns.droplevel(0)
+        html = fetch(url)
+        df = read_table(html, 'mvp_NBA')
         df = df[['Season', 'Player']]
         df['Season'] = df['Season'].str[:2] + df['Season'].str[5:7]
         mvp_lists = df.values.tolist()
@@ -36,12 +37,13 @@ class awards:
             print('No All Star game in 1999 season')
         else:
             url = f'https://www.basketball-reference.com/allstar/NBA_{season}.html'
-            html = urllib.request.urlopen(url)
-            soup = BeautifulSoup(html, 'html.parser')
-            name_html = soup.findAll('a', string=re.compile('[a-z]'),
-                                       href=re.compile('^/players/.+'),
-                                       title=False)
-            names = [tag.text for tag in name_html]
+            html = fetch(url, ttl=season_ttl(season))
+            doc = parse(html)
+            name_html = [tag for tag in doc.iter('a')
+                         if re.match('^/players/.+', tag.get('href') or '')
+                         and tag.get('title') is None
+                         and re.search('[a-z]', tag.text_content())]
+            names = [tag.text_content() for tag in name_html]
             names = list(set(names))
             return names
 
@@ -49,44 +51,35 @@ class get_data:
     @staticmethod
     def team_records(season):
         url = f'https://www.basketball-reference.com/leagues/NBA_{season}.html'
-        html = urllib.request.urlopen(url)
-        soup = BeautifulSoup(html, 'html.parser')
-        table_html_links = soup.findAll('table', id=re.compile('advanced-team'))[0].findAll('a')
+        html = fetch(url, ttl=season_ttl(season))
+        table = find_table(parse(html), 'advanced-team')
         team_name = []
         team_abrv = []
-        for tag in table_html_links:
-            abrv = tag.get('href')
+        for tag in table.iter('a'):
+            abrv = tag.get('href') or ''
             pattern = re.compile(r'([A-Z]{3})')
             match = pattern.search(abrv)
             if match:
                 team_abrv.append(match.group())
-                team_name.append(tag.text)
-        team_abrv = list(zip(team_name, team_abrv))
+                team_name.append(tag.text_content())
+        # Team name -> abbreviation (the first link for a name wins).
+        abbreviations = {}
+        for name, abrv in zip(team_name, team_abrv):
+            abbreviations.setdefault(name, abrv)
         
-        table = soup.findAll('table', id=re.compile('advanced-team'))
-        team_records = pd.read_html(StringIO(str(table)))[0]
-        team_records = team_records.apply(pd.to_numeric, errors='coerce').fillna(team_records)
-        team_records.columns = team_records.columns.droplevel(0)
+        team_records = table_frame(table)
         team_records = team_records.drop('Rk', axis=1)
         team_records = team_records.loc[:, ['Team', 'W', 'L']]
         team_records['Team'] = team_records['Team'].str.replace('*','', regex=False)
-        team_names = [i[0] for i in team_abrv]
-        team_abbrevation = [i[1] for i in team_abrv]
-        for i in team_records.index:
-            team = team_records.loc[i, 'Team']
-            if team in team_names:
-                idx = team_names.index(team)
-                team_records.loc[i, 'Team'] = team_abbrevation[idx]
+        team_records['Team'] = team_records['Team'].map(abbreviations).fillna(team_records['Team'])
         return team_records
 
     @staticmethod
     def single(season, stats, additional_data=False, salary=False):
         print('Loading', season, 'data...')
         url = f'https://www.basketball-reference.com/leagues/NBA_{season}_{stats}.html'
-        html = urllib.request.urlopen(url)
-        soup = BeautifulSoup(html, 'html.parser')
-        table_html = soup.findAll('table')
-        df = pd.read_html(StringIO(str(table_html)))[0]
+        html = fetch(url, ttl=season_ttl(season))
+        df = read_table(html)
         
         # Remove duplicate header rows and drop the ranking column.
         df = df.drop(df[df.Player == 'Player'].index)
@@ -95,16 +88,10 @@ class get_data:
         # Clean up and normalize player names.
         df['Player'] = df['Player'].str.replace('*', '', regex=False)
         df['Player'] = df['Player'].apply(normalize_name)
-        # Replace "Bub Carrington" with "Carlton Carrington" and, for any name ending with "Jr.",
-        # remove the trailing period.
-        df['Player'] = df['Player'].apply(
-            lambda x: "Carlton Carrington" if x.strip() == "Bub Carrington"
-            else ("R.J. Barrett" if x.strip() == "RJ Barrett"
-            else (x[:-1] if x.strip().endswith("Jr.") else x))
-        )
         
-        # Create a helper key column for duplicate resolution.
-        df['Player_key'] = df['Player']
+        # Create a helper key column for duplicate resolution. Canonical keys (see modules/player_names.py)
+        # also cover spelling variants such as "RJ Barrett" / "R.J. Barrett" and "Jr." suffixes.
+        df['Player_key'] = df['Player'].apply(player_key)
         
         df.insert(0, 'Season', season)
         df = df.apply(pd.to_numeric, errors='coerce').fillna(df)
@@ -119,13 +106,9 @@ class get_data:
             mvp = awards.mvp(season)
             df.loc[df['Player'] == mvp, 'MVP'] = 1
 
+            # Keyed team table (the first row for a team wins); players of unknown teams get 0 / 0.
             team_records_df = get_data.team_records(season)
-            team_records_list = team_records_df.values.tolist()
-            df['team_win'] = 0
-            df['team_lose'] = 0
-            teams = [i[0] for i in team_records_list]
-            win = [i[1] for i in team_records_list]
-            lose = [i[2] for i in team_records_list]
+            team_table = team_records_df.drop_duplicates('Team').set_index('Team')
 
             if 'Tm' in df.columns:
                 team_col = 'Tm'
@@ -134,34 +117,24 @@ class get_data:
             else:
                 raise KeyError("No team column found in the stats DataFrame.")
 
-            for i in df.index:
-                team = df.loc[i, team_col]
-                if team in teams:
-                    idx = teams.index(team)
-                    df.loc[i, 'team_win'] = win[idx]
-                    df.loc[i, 'team_lose'] = lose[idx]
-                else:
-                    df.loc[i, 'team_win'] = 0
-                    df.loc[i, 'team_lose'] = 0
+            df['team_win'] = df[team_col].map(team_table['W']).fillna(0)
+            df['team_lose'] = df[team_col].map(team_table['L']).fillna(0)
 
         if salary:
             def get_salary(season):
                 season_str = str(int(season) - 1) + '-' + str(int(season))
                 url = f'https://hoopshype.com/salaries/players/{season_str}/'
-                html = urllib.request.urlopen(url)
-                soup = BeautifulSoup(html, 'html.parser')
-                salary_df = pd.read_html(StringIO(str(soup)))[0]
+                html = fetch(url, ttl=season_ttl(season))
+                salary_df = read_table(html)
                 salary_df = salary_df.iloc[:, [1, 3]]
                 salary_df = salary_df.rename(columns={salary_df.columns[1]: 'Salary'})
                 return salary_df
 
             stats_df = df.copy()
             salary_df = get_salary(season)
-            salary_names = salary_df['Player'].tolist()
-            for salary_name in salary_names:
-                stats_df['Player'] = stats_df['Player'].apply(
-                    lambda stats_name: salary_name if fuzz.ratio(stats_name, salary_name) >= 80 else stats_name
-                )
+            # One-to-one fuzzy match of stats names to salary names (see player_names.match_names).
+            matches = match_names(stats_df['Player'], salary_df['Player'], threshold=80)
+            stats_df['Player'] = stats_df['Player'].map(matches).fillna(stats_df['Player'])
             df = pd.merge(stats_df, salary_df, how='left', on='Player')
         
         # Duplicate resolution: group by the helper key "Player_key"
@@ -173,17 +146,18 @@ class get_data:
             team_col = None
 
         if team_col:
-            def select_row(group):
-                # Look for rows where the team column matches the pattern "^\d+TM$"
-                matches = group[group[team_col].astype(str).str.match(r'^\d+TM$')]
-                if not matches.empty:
-                    return matches.iloc[0]
-                else:
-                    return group.iloc[0]
-            df = df.groupby('Player_key', as_index=False).apply(select_row).reset_index(drop=True)
-            df = df.rename(columns={'Player_key': 'Player'})
-        else:
-            df = df.drop(columns=['Player_key'])
+            # Keep one row per player, preferring the season-total row of a traded player (team "2TM",
+            # "3TM"...) and otherwise the first row: a stable sort puts those rows first within each
+            # key, then drop_duplicates keeps them. Rows come out ordered by key.
+            not_total = ~df[team_col].astype(str).str.match(r'^\d+TM$')
+            df = (
+                df.assign(_not_total=not_total.to_numpy())
+                .sort_values(['Player_key', '_not_total'], kind='stable')
+                .drop_duplicates('Player_key')
+                .drop(columns=['_not_total'])
+                .reset_index(drop=True)
+            )
+        df = df.drop(columns=['Player_key'], errors='ignore')
         
         # Ensure columns are unique.
         if not df.columns.is_unique:
@@ -195,21 +169,19 @@ class get_data:
         return df
 
     @staticmethod
-    def multiple(start_year, end_year, stats, additional_data=False, salary=False):
+    def multiple(start_year, end_year, stats, additional_data=False, salary=False, max_workers=MAX_SEASON_WORKERS):
+        """
+        Stats for every season from start_year to end_year, concatenated in season order.
+        Seasons are loaded by up to `max_workers` threads; page fetches go through the shared HTML
+        cache, so pages already fetched (e.g. the MVP page) are not downloaded again.
+        """
         if additional_data:
-            df = get_data.single(start_year, stats, additional_data=True)
+            options = {'additional_data': True}
         elif salary:
-            df = get_data.single(start_year, stats, salary=True)
+            options = {'salary': True}
         else:
-            df = get_data.single(start_year, stats)
-        
-        while start_year < end_year:
-            start_year += 1
-            if additional_data:
-                df_next = get_data.single(start_year, stats, additional_data=True)
-            elif salary:
-                df_next = get_data.single(start_year, stats, salary=True)
-            else:
-                df_next = get_data.single(start_year, stats)
-            df = pd.concat([df, df_next])
-        return df
+            options = {}
+        seasons = range(start_year, end_year + 1)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(seasons)))) as executor:
+            frames = list(executor.map(lambda season: get_data.single(season, stats, **options), seasons))
+        return pd.concat(frames)
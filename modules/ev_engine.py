@@ -0,0 +1,361 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from modules.fair_price import book_weight, devig_consensus
+
+# Columnar EV engine: flattens every event into one row per (event, book, market, outcome) and computes
+# implied probabilities, Pinnacle no-vig pairs, market width and EV as array operations.
+# It mirrors positiveev.process_all_odds (Pinnacle, then the multi-book consensus, then average odds)
+# and returns the same play records.
+
+EXCLUDED_BOOKS = {"lowvig", "pinnacle"}
+PLAYER_MARKET_PREFIXES = ("player", "batter", "pitcher", "team")
+LINE_MARKET_PREFIXES = ("spreads", "alternate_spreads", "totals", "alternate_totals")
+
+# Sentinels stand in for None inside group keys so pandas never drops or mismatches them.
+MISSING_POINT = -1e18
+MISSING_TEXT = "\x00"
+
+# Pinnacle pairing rule per market, as in positiveev.EventIndex._pinnacle_line.
+PAIR_NONE, PAIR_H2H, PAIR_SPREAD, PAIR_TOTAL, PAIR_PROP = range(5)
+
+# ----- Batch Odds Conversion -----
+def american_to_implied_prob_array(odds):
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(odds > 0, 100 / (odds + 100), np.abs(odds) / (np.abs(odds) + 100))
+
+def american_to_profit_array(odds):
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide="ignore"):
+        return np.where(odds > 0, odds, 10000 / np.abs(odds))
+
+def no_vig_american_odds_array(prob):
+    """Vectorized no_vig_american_odds; returns floats truncated toward zero, NaN where prob is 0."""
+    prob = np.asarray(prob, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dec = 1 / prob
+        odds = np.where(dec >= 2, (dec - 1) * 100, -100 / (dec - 1))
+    return np.where(prob == 0, np.nan, np.trunc(odds))
+
+def calculate_ev_array(fair_prob, sportsbook_odds):
+    profit_if_win = american_to_profit_array(sportsbook_odds)
+    return np.round((fair_prob * profit_if_win) - (1 - fair_prob) * 100, 4)
+
+def pair_rule(market_key):
+    if market_key.startswith("h2h"):
+        return PAIR_H2H
+    if market_key in {"spreads", "alternate_spreads"}:
+        return PAIR_SPREAD
+    if market_key.startswith(("totals", "alternate_totals")):
+        return PAIR_TOTAL
+    if market_key.startswith(PLAYER_MARKET_PREFIXES):
+        return PAIR_PROP
+    return PAIR_NONE
+
+def line_rule(market_key):
+    """How a bookmaker's market splits into two-sided lines for the consensus, as in positiveev.two_sided_lines."""
+    if market_key.startswith("h2h"):
+        return PAIR_H2H
+    if market_key.startswith(("spreads", "alternate_spreads")):
+        return PAIR_SPREAD
+    if market_key.startswith(("totals", "alternate_totals")):
+        return PAIR_TOTAL
+    if market_key.startswith(PLAYER_MARKET_PREFIXES):
+        return PAIR_PROP
+    return PAIR_NONE
+
+def _pair_keys(frame):
+    """Group-key columns that select the two Pinnacle sides a row is priced against."""
+    rule = frame["market"].map({key: pair_rule(key) for key in frame["market"].unique()}).to_numpy()
+    point = np.where(rule == PAIR_H2H, MISSING_POINT, frame["point_key"].to_numpy())
+    description = np.where(rule == PAIR_PROP, frame["description_key"].to_numpy(), MISSING_TEXT)
+    return rule, point, description
+
+def _play_keys(frame):
+    """Group-key columns matching positiveev.play_key."""
+    markets = frame["market"].unique()
+    line = frame["market"].map({key: key.startswith(LINE_MARKET_PREFIXES) for key in markets}).to_numpy(dtype=bool)
+    prop = frame["market"].map({key: key.startswith(PLAYER_MARKET_PREFIXES) for key in markets}).to_numpy(dtype=bool)
+    point = np.where(line | prop, frame["point_key"].to_numpy(), MISSING_POINT)
+    description = np.where(prop, frame["description_key"].to_numpy(), MISSING_TEXT)
+    return point, description
+
+# ----- Flattening -----
+def flatten_events(data, now=None):
+    """
+    Flatten upcoming events into columnar form.
+    Returns (events, rows, raw, pinnacle) where `events` holds per-event metadata, `rows` has one row per
+    outcome of every bookmaker, `raw` keeps the original Python values behind `rows` (so output records
+    serialize exactly as the feed had them) and `pinnacle` holds the outcomes of the Pinnacle market used for
+    de-vigging (the first market per key in the last Pinnacle book, as the scalar path picks it).
+    """
+    now = now or datetime.now(timezone.utc)
+    events = []
+    columns = {"event": [], "market_pos": [], "book": [], "market": [], "name": [], "description": [], "point": [], "price": []}
+    pinnacle = {"event": [], "market": [], "name": [], "description": [], "point": [], "price": []}
+    market_count = 0
+
+    for event in data:
+        # Skip events that have already started.
+        commence_time_str = event.get("commence_time")
+        if commence_time_str:
+            try:
+                event_start_time = datetime.fromisoformat(commence_time_str.replace("Z", "+00:00"))
+                if event_start_time <= now:
+                    continue
+            except Exception as e:
+                print(f"Error parsing commence_time for event {event.get('id')}: {e}")
+                continue
+
+        event_pos = len(events)
+        events.append((event.get("id"), event.get("sport_label"), event.get("home_team"), event.get("away_team")))
+        chosen = {}
+        for bookmaker in (event.get("odds") or {}).get("bookmakers", []):
+            bk = bookmaker.get("key")
+            pinnacle_seen = set()
+            for market in bookmaker.get("markets", []):
+                market_key = market.get("key")
+                outcomes = market.get("outcomes", [])
+                if bk == "pinnacle" and market_key not in pinnacle_seen:
+                    pinnacle_seen.add(market_key)
+                    chosen[market_key] = outcomes
+                # Every bookmaker market gets its own position so the consensus pairs sides within it.
+                market_pos = market_count
+                market_count += 1
+                for outcome in outcomes:
+                    columns["event"].append(event_pos)
+                    columns["market_pos"].append(market_pos)
+                    columns["book"].append(bk)
+                    columns["market"].append(market_key)
+                    columns["name"].append(outcome.get("name"))
+                    columns["description"].append(outcome.get("description"))
+                    columns["point"].append(outcome.get("point"))
+                    columns["price"].append(outcome.get("price"))
+        for market_key, outcomes in chosen.items():
+            for outcome in outcomes:
+                pinnacle["event"].append(event_pos)
+                pinnacle["market"].append(market_key)
+                pinnacle["name"].append(outcome.get("name"))
+                pinnacle["description"].append(outcome.get("description"))
+                pinnacle["point"].append(outcome.get("point"))
+                pinnacle["price"].append(outcome.get("price"))
+
+    return events, _to_frame(columns), columns, _to_frame(pinnacle)
+
+def _to_frame(columns):
+    frame = pd.DataFrame({
+        "event": np.asarray(columns["event"], dtype=np.int64),
+        "market": pd.Series(columns["market"], dtype=object).fillna(""),
+    })
+    if "book" in columns:
+        frame["market_pos"] = np.asarray(columns["market_pos"], dtype=np.int64)
+        frame["book"] = pd.Series(columns["book"], dtype=object)
+    frame["name_key"] = pd.Series(columns["name"], dtype=object).fillna(MISSING_TEXT)
+    frame["description_key"] = pd.Series(columns["description"], dtype=object).fillna(MISSING_TEXT)
+    frame["point_key"] = pd.to_numeric(pd.Series(columns["point"], dtype=object), errors="coerce").fillna(MISSING_POINT)
+    frame["price"] = pd.to_numeric(pd.Series(columns["price"], dtype=object), errors="coerce")
+    frame["price_is_int"] = [isinstance(price, int) for price in columns["price"]]
+    return frame
+
+# ----- Fair Probability & Market Width -----
+def pinnacle_pairs(pinnacle):
+    """De-vig every two-sided Pinnacle line. One row per line with its first side's name, both no-vig probabilities and the width."""
+    if pinnacle.empty:
+        return pd.DataFrame(columns=["event", "market", "pair_point", "pair_description", "first_name", "pin_prob1", "pin_prob2", "pin_width"])
+    rule, point, description = _pair_keys(pinnacle)
+    lines = pd.DataFrame({
+        "event": pinnacle["event"].to_numpy(),
+        "market": pinnacle["market"].to_numpy(),
+        "pair_point": point,
+        "pair_description": description,
+        "name_key": pinnacle["name_key"].to_numpy(),
+        "price": pinnacle["price"].to_numpy(),
+    })[rule != PAIR_NONE]
+    keys = ["event", "market", "pair_point", "pair_description"]
+    grouped = lines.groupby(keys, sort=False)
+    lines = lines.assign(side=grouped.cumcount(), size=grouped["price"].transform("size"))
+    lines = lines[lines["size"] == 2]
+    first = lines[lines["side"] == 0].set_index(keys)
+    second = lines[lines["side"] == 1].set_index(keys)
+    pairs = pd.DataFrame({"first_name": first["name_key"], "price1": first["price"]}).join(second["price"].rename("price2"))
+
+    prob1 = american_to_implied_prob_array(pairs["price1"])
+    prob2 = american_to_implied_prob_array(pairs["price2"])
+    total = prob1 + prob2
+    pairs["pin_prob1"] = prob1 / total
+    pairs["pin_prob2"] = prob2 / total
+    pairs["pin_width"] = np.round(np.abs(np.abs(pairs["price1"]) - np.abs(pairs["price2"])), 2)
+    return pairs.drop(columns=["price1", "price2"]).reset_index()
+
+def consensus_prices(rows, events):
+    """
+    Multi-book no-vig consensus per play: pair both sides of every book's two-sided lines, de-vig them
+    with devig_consensus and take the book-weighted average. The width comes from the most heavily
+    weighted book's line (the first one on ties, as in positiveev.EventIndex.consensus).
+    """
+    play_columns = ["event", "market", "name_key", "play_point", "play_description"]
+    rule = rows["market"].map({key: line_rule(key) for key in rows["market"].unique()}).to_numpy()
+    home_teams = np.array([event[2] for event in events] + [None], dtype=object)
+    point = rows["point_key"].to_numpy()
+    is_home = rows["name_key"].to_numpy() == home_teams[rows["event"].to_numpy()]
+    # Spreads are keyed by the line from the home team's perspective so -3.5 / +3.5 land together (+ 0.0 folds -0.0).
+    line_point = np.where(rule == PAIR_SPREAD, np.where(is_home, point, -point) + 0.0, point)
+    line_point = np.where(rule == PAIR_H2H, MISSING_POINT, line_point)
+    line_description = np.where(rule == PAIR_PROP, rows["description_key"].to_numpy(), MISSING_TEXT)
+    play_point, play_description = _play_keys(rows)
+    usable = (rule != PAIR_NONE) & ((rule != PAIR_SPREAD) | (point != MISSING_POINT))
+
+    lines = pd.DataFrame({
+        "market_pos": rows["market_pos"].to_numpy(),
+        "line_point": line_point,
+        "line_description": line_description,
+        "event": rows["event"].to_numpy(),
+        "market": rows["market"].to_numpy(),
+        "book": rows["book"].to_numpy(),
+        "name_key": rows["name_key"].to_numpy(),
+        "play_point": play_point,
+        "play_description": play_description,
+        "price": rows["price"].to_numpy(),
+    })[usable]
+    keys = ["market_pos", "line_point", "line_description"]
+    grouped = lines.groupby(keys, sort=False)
+    lines = lines.assign(
+        side=grouped.cumcount(),
+        size=grouped["price"].transform("size"),
+        priced=grouped["price"].transform("count"),
+        names=grouped["name_key"].transform("nunique"),
+    )
+    lines = lines[(lines["size"] == 2) & (lines["priced"] == 2) & (lines["names"] == 2)]
+    if lines.empty:
+        return pd.DataFrame(columns=play_columns + ["cons_prob", "cons_width"])
+    side_a = lines[lines["side"] == 0].set_index(keys)
+    side_b = lines[lines["side"] == 1].set_index(keys).reindex(side_a.index)
+
+    fair_a, fair_b = devig_consensus(
+        american_to_implied_prob_array(side_a["price"]), american_to_implied_prob_array(side_b["price"])
+    )
+    weight = side_a["book"].map(book_weight).to_numpy(dtype=float)
+    width = np.round(np.abs(np.abs(side_a["price"].to_numpy()) - np.abs(side_b["price"].to_numpy())), 2)
+    order = np.arange(len(side_a))
+    sides = pd.concat([
+        side_a[play_columns].reset_index(drop=True).assign(weight=weight, weighted=weight * fair_a, width=width, order=2 * order),
+        side_b[play_columns].reset_index(drop=True).assign(weight=weight, weighted=weight * fair_b, width=width, order=2 * order + 1),
+    ]).sort_values("order", kind="stable")
+
+    grouped = sides.groupby(play_columns, sort=False)
+    consensus = (grouped["weighted"].sum() / grouped["weight"].sum()).rename("cons_prob").to_frame()
+    heaviest = sides.sort_values("weight", ascending=False, kind="stable").drop_duplicates(play_columns)
+    consensus["cons_width"] = heaviest.set_index(play_columns)["width"]
+    return consensus.reset_index()
+
+def average_by_name(rows):
+    """Last fallback when no line can be de-vigged: average implied probability and price spread per (event, market, name)."""
+    keys = ["event", "market", "name_key"]
+    frame = rows[keys + ["price_is_int"]].assign(
+        implied=american_to_implied_prob_array(rows["price"]),
+        abs_price=np.abs(rows["price"]),
+    )
+    grouped = frame.groupby(keys, sort=False)
+    return pd.DataFrame({
+        "avg_prob": grouped["implied"].mean(),
+        "avg_width": (grouped["abs_price"].max() - grouped["abs_price"].min()).round(2),
+        "avg_width_int": grouped["price_is_int"].all(),
+    }).reset_index()
+
+def price_candidates(rows, pinnacle, events):
+    """Attach fair probability, market width and EV to every bettable row."""
+    candidates = rows[~rows["book"].isin(EXCLUDED_BOOKS) & rows["price"].notna()]
+    candidates = candidates.assign(row=candidates.index)
+    _, point, description = _pair_keys(candidates)
+    play_point, play_description = _play_keys(candidates)
+    candidates = candidates.assign(pair_point=point, pair_description=description, play_point=play_point, play_description=play_description)
+    candidates = candidates.merge(pinnacle_pairs(pinnacle), how="left", on=["event", "market", "pair_point", "pair_description"])
+    candidates = candidates.merge(consensus_prices(rows, events), how="left", on=["event", "market", "name_key", "play_point", "play_description"])
+    candidates = candidates.merge(average_by_name(rows), how="left", on=["event", "market", "name_key"])
+
+    pin_prob = np.where(candidates["name_key"] == candidates["first_name"], candidates["pin_prob1"], candidates["pin_prob2"]).astype(float)
+    cons_prob = candidates["cons_prob"].to_numpy(dtype=float)
+    use_pinnacle = ~np.isnan(pin_prob)
+    use_consensus = ~use_pinnacle & ~np.isnan(cons_prob)
+    candidates["fair_prob"] = np.select([use_pinnacle, use_consensus], [pin_prob, cons_prob], candidates["avg_prob"].to_numpy(dtype=float))
+    candidates["market_width"] = np.select(
+        [use_pinnacle, use_consensus],
+        [candidates["pin_width"].to_numpy(dtype=float), candidates["cons_width"].to_numpy(dtype=float)],
+        candidates["avg_width"].to_numpy(dtype=float),
+    )
+    candidates["width_is_int"] = ~use_pinnacle & ~use_consensus & candidates["avg_width_int"].fillna(False).to_numpy(dtype=bool)
+    candidates["ev"] = calculate_ev_array(candidates["fair_prob"].to_numpy(), candidates["price"].to_numpy())
+    return candidates
+
+# ----- Main Vectorized Entry Point -----
+def process_all_odds_vectorized(data, now=None):
+    """Vectorized equivalent of positiveev.process_all_odds."""
+    events, rows, raw, pinnacle = flatten_events(data, now)
+    if rows.empty:
+        return []
+    candidates = price_candidates(rows, pinnacle, events)
+
+    # Only keep outcomes with positive EV and an acceptable market width.
+    width = candidates["market_width"]
+    mask = candidates["fair_prob"].notna() & (candidates["ev"] > 0.5) & (candidates["ev"] < 10) & (width.isna() | (width <= 25))
+    passing = candidates[mask]
+    if passing.empty:
+        return []
+
+    play_point, play_description = _play_keys(rows)
+    play_groups = pd.DataFrame({
+        "event": rows["event"], "market": rows["market"], "name_key": rows["name_key"],
+        "play_point": play_point, "play_description": play_description,
+    }).groupby(["event", "market", "name_key", "play_point", "play_description"], sort=False).indices
+    row_play_point, row_play_description = _play_keys(passing)
+
+    ev_plays = {}
+    fair_probs = passing["fair_prob"].to_numpy()
+    fair_odds = no_vig_american_odds_array(fair_probs)
+    widths = passing["market_width"].to_numpy()
+    width_is_int = passing["width_is_int"].to_numpy()
+    name_keys = passing["name_key"].to_numpy()
+    for i, (row, ev) in enumerate(zip(passing["row"].to_numpy(), passing["ev"].to_numpy())):
+        event_id, sport, home_team, away_team = events[raw["event"][row]]
+        market_key = raw["market"][row]
+        team = raw["name"][row]
+        point = raw["point"][row]
+        description = raw["description"][row]
+        unique_id = f"{event_id}_{market_key.upper()}_{team}_{description or ''}_{point or 'NA'}"
+        ev = float(ev)
+        # If this play already exists, only keep the one with the highest EV.
+        if unique_id in ev_plays and not ev > ev_plays[unique_id]["ev"]:
+            continue
+
+        market_width = widths[i]
+        if np.isnan(market_width):
+            market_width = None
+        elif width_is_int[i]:
+            market_width = int(market_width)
+        else:
+            market_width = float(market_width)
+        play_rows = play_groups[(raw["event"][row], market_key or "", name_keys[i], row_play_point[i], row_play_description[i])]
+        ev_plays[unique_id] = {
+            "unique_id": unique_id,
+            "event_id": event_id,
+            "sport": sport,
+            "home_team": home_team,
+            "away_team": away_team,
+            "market": market_key,
+            "bookmaker": raw["book"][row],
+            "team": team,
+            "point": point,
+            "description": description,
+            "sportsbook_odds": raw["price"][row],
+            "fair_prob": round(float(fair_probs[i]), 4),
+            "fair_american_odds": None if np.isnan(fair_odds[i]) else int(fair_odds[i]),
+            "ev": round(ev, 2),
+            "market_width": market_width,
+            "aggregated_odds": [
+                {"bookmaker": raw["book"][j], "price": raw["price"][j], "point": raw["point"][j], "description": raw["description"][j]}
+                for j in play_rows
+            ]
+        }
+    # Return only the highest EV plays
+    return list(ev_plays.values())
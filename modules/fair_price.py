@@ -0,0 +1,49 @@
+import numpy as np
+
+# Consensus fair-price model: every bookmaker's two-sided line is de-vigged with the multiplicative,
+# power and Shin methods, and the books are combined with a weighted average that leans on sharp books.
+# All functions take arrays of implied probabilities (one element per two-sided line) so a whole market,
+# or a whole slate, is de-vigged in one call.
+
+BOOK_WEIGHTS = {"pinnacle": 3.0, "lowvig": 2.0, "betonlineag": 1.5}
+DEFAULT_BOOK_WEIGHT = 1.0
+
+def book_weight(book):
+    return BOOK_WEIGHTS.get(book, DEFAULT_BOOK_WEIGHT)
+
+def devig_multiplicative(p1, p2):
+    """Scale both sides by the overround."""
+    total = p1 + p2
+    return p1 / total, p2 / total
+
+def devig_power(p1, p2, iterations=30):
+    """Find k with p1**k + p2**k == 1 (Newton's method) and return p1**k, p2**k."""
+    log1 = np.log(p1)
+    log2 = np.log(p2)
+    k = np.ones_like(p1)
+    for _ in range(iterations):
+        a = np.exp(k * log1)
+        b = np.exp(k * log2)
+        k = k - (a + b - 1) / (a * log1 + b * log2)
+    q1 = np.exp(k * log1)
+    q2 = np.exp(k * log2)
+    return q1 / (q1 + q2), q2 / (q1 + q2)
+
+def devig_shin(p1, p2):
+    """Shin's insider-trading model, using the closed-form insider share z for two outcomes."""
+    total = p1 + p2
+    diff_sq = (p1 - p2) ** 2
+    z = ((total - 1) * (diff_sq - total)) / (total * (diff_sq - 1))
+    q1 = (np.sqrt(z ** 2 + 4 * (1 - z) * p1 ** 2 / total) - z) / (2 * (1 - z))
+    q2 = (np.sqrt(z ** 2 + 4 * (1 - z) * p2 ** 2 / total) - z) / (2 * (1 - z))
+    return q1 / (q1 + q2), q2 / (q1 + q2)
+
+def devig_consensus(p1, p2):
+    """Average of the multiplicative, power and Shin fair probabilities for each line."""
+    p1 = np.asarray(p1, dtype=float)
+    p2 = np.asarray(p2, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        methods = [devig_multiplicative(p1, p2), devig_power(p1, p2), devig_shin(p1, p2)]
+    q1 = sum(method[0] for method in methods) / len(methods)
+    q2 = sum(method[1] for method in methods) / len(methods)
+    return q1, q2
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from modules.snapshot_store import SNAPSHOT_PREFIX, RUN_FORMAT, load_manifest, read_entry, snapshot_history
+from modules import odds_history_db
+
+# Line-movement history for the app. Snapshot runs (see modules/snapshot_store.py) are loaded into the
+# local SQLite store (modules/odds_history_db.py); each refresh only fetches runs newer than the newest
+# loaded one (the watermark) and evicts rows older than HISTORY_TTL_DAYS. Lookups are indexed queries
+# against the database, so the interactive path never touches S3.
+HISTORY_TTL_DAYS = float(os.getenv("HISTORY_TTL_DAYS", "2"))
+# Minimum time between manifest checks; page reruns in between are served from the database.
+HISTORY_REFRESH_SECONDS = 60
+CHART_COLUMNS = ["Time", "Odds", "Book"]
+
+class HistoryStore:
+    """Incrementally refreshed line-movement history backed by the SQLite time-series store."""
+    def __init__(self, remote, db_path=odds_history_db.DB_FILE, ttl_days=HISTORY_TTL_DAYS,
+                 refresh_seconds=HISTORY_REFRESH_SECONDS, prefix=SNAPSHOT_PREFIX):
+        self.remote = remote
+        self.db_path = db_path
+        self.conn = odds_history_db.create(db_path)
+        self.ttl = timedelta(days=ttl_days)
+        self.refresh_seconds = refresh_seconds
+        self.prefix = prefix
+        self.last_refresh = None
+        # Refreshes write through self.conn under the lock; lookups use a per-thread connection,
+        # so WAL lets them read while a refresh is writing.
+        self.lock = threading.Lock()
+        self.readers = threading.local()
+
+    def refresh(self, now=None, force=False):
+        """
+        Load new runs from the remote store and evict expired rows.
+        Returns the number of snapshot files loaded; checks within `refresh_seconds` of the last one are skipped.
+        """
+        with self.lock:
+            if not force and self.last_refresh is not None and time.monotonic() - self.last_refresh < self.refresh_seconds:
+                return 0
+            now = now or datetime.now(timezone.utc)
+            cutoff = (now - self.ttl).replace(microsecond=0)
+            loaded = odds_history_db.loaded_files(self.conn)
+            watermark = max(loaded.values(), default="")
+            # Only the manifests from the watermark's day (or the TTL cutoff's, if later) onwards are read.
+            since = cutoff
+            if watermark:
+                since = max(cutoff, datetime.strptime(watermark, RUN_FORMAT).replace(tzinfo=timezone.utc))
+            new_entries = [
+                entry for entry in load_manifest(self.remote, since, now, self.prefix)
+                if entry["run"] > watermark and entry["key"] not in loaded
+            ]
+            fetched = 0
+            for entry in new_entries:
+                frame = read_entry(self.remote, entry)
+                if frame is None:
+                    continue
+                odds_history_db.insert_snapshot(self.conn, frame, files=[entry["key"]], run=entry["run"])
+                fetched += 1
+            odds_history_db.prune(self.conn, int(cutoff.timestamp()), cutoff.strftime(RUN_FORMAT))
+            self.last_refresh = time.monotonic()
+            return fetched
+
+    def _reader(self):
+        if not hasattr(self.readers, "conn"):
+            self.readers.conn = odds_history_db.connect(self.db_path)
+        return self.readers.conn
+
+    def get(self, unique_key):
+        """Snapshots of one unique key, oldest first, shaped as in snapshot_history."""
+        rows = odds_history_db.price_history(self._reader(), unique_key=unique_key)
+        return snapshot_history(odds_history_db.to_snapshot_frame(rows)).get(unique_key, [])
+
+    def chart_data(self, tail, tz="US/Central", start=None, end=None):
+        """
+        Time / Odds / Book rows for every snapshot matching `tail`, in time order, with times in `tz`.
+        `start` / `end` (datetimes) limit the range.
+        """
+        rows = odds_history_db.price_history(
+            self._reader(), tail=tail,
+            start_ts=int(start.timestamp()) if start else None,
+            end_ts=int(end.timestamp()) if end else None,
+        )
+        return pd.DataFrame({
+            "Time": pd.to_datetime(rows["ts"], unit="s", utc=True).dt.tz_convert(tz),
+            "Odds": rows["price"],
+            "Book": rows["bookmaker"],
+        }, columns=CHART_COLUMNS)
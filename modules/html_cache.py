@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+# Fetch layer for the reference-site scrapers. Pages are kept in a content-addressed on-disk cache:
+#   <HTML_CACHE_DIR>/objects/<sha256[:2]>/<sha256>.html   page bodies, stored once per distinct content
+#   <HTML_CACHE_DIR>/index.json                            url -> {sha256, etag, last_modified, fetched_at}
+# A cached page younger than its TTL is served without touching the network; an older one is
+# revalidated with If-None-Match / If-Modified-Since, so an unchanged page costs a 304 and no body.
+HTML_CACHE_DIR = os.getenv("HTML_CACHE_DIR", "data/html_cache")
+DEFAULT_TTL_SECONDS = 6 * 3600
+# Politeness: the sports-reference sites allow about 20 requests a minute per client.
+HOST_MIN_INTERVAL = float(os.getenv("HTML_HOST_MIN_INTERVAL", "3.1"))
+HOST_MAX_CONCURRENT = int(os.getenv("HTML_HOST_MAX_CONCURRENT", "2"))
+USER_AGENT = "Mozilla/5.0 (compatible; betversa-stats/1.0)"
+
+class HostLimiter:
+    """Per-host politeness: at most `max_concurrent` requests in flight and `min_interval` seconds between starts."""
+    def __init__(self, min_interval=HOST_MIN_INTERVAL, max_concurrent=HOST_MAX_CONCURRENT):
+        self.min_interval = min_interval
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.semaphores = {}
+        self.next_start = {}
+
+    @contextmanager
+    def slot(self, host):
+        with self.lock:
+            semaphore = self.semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+        with semaphore:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_start.get(host, now))
+                self.next_start[host] = start + self.min_interval
+            time.sleep(max(0.0, start - now))
+            yield
+
+class HtmlCache:
+    """Content-addressed, TTL and ETag aware page cache; safe to share between threads."""
+    def __init__(self, cache_dir=HTML_CACHE_DIR, limiter=None):
+        self.cache_dir = cache_dir
+        self.limiter = limiter or HostLimiter()
+        self.lock = threading.Lock()
+        # One lock per URL, so concurrent callers of the same page wait for one download instead of
+        # each fetching it.
+        self.url_locks = {}
+        self.index_path = os.path.join(cache_dir, "index.json")
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest + ".html")
+
+    def _read_object(self, digest):
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store(self, url, body, headers):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(body)
+            os.replace(path + ".tmp", path)
+        self._record(url, {
+            "sha256": digest,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
+
+    def _record(self, url, entry):
+        with self.lock:
+            self.index[url] = entry
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.index_path + ".tmp", "w") as f:
+                json.dump(self.index, f)
+            os.replace(self.index_path + ".tmp", self.index_path)
+
+    def fetch(self, url, ttl=DEFAULT_TTL_SECONDS):
+        """
+        Return the body of `url` as bytes. `ttl` is how long (seconds) a cached copy is served without
+        revalidation; None means a cached copy never expires (for pages that no longer change).
+        """
+        with self.lock:
+            url_lock = self.url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            return self._fetch(url, ttl)
+
+    def _fetch(self, url, ttl):
+        with self.lock:
+            entry = self.index.get(url)
+        body = self._read_object(entry["sha256"]) if entry else None
+        if body is not None and (ttl is None or time.time() - entry["fetched_at"] < ttl):
+            return body
+
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        if body is not None:
+            if entry.get("etag"):
+                request.add_header("If-None-Match", entry["etag"])
+            if entry.get("last_modified"):
+                request.add_header("If-Modified-Since", entry["last_modified"])
+        with self.limiter.slot(urllib.parse.urlsplit(url).netloc):
+            try:
+                with urllib.request.urlopen(request) as response:
+                    fresh = response.read()
+                    headers = response.headers
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or body is None:
+                    raise
+                self._record(url, dict(entry, fetched_at=time.time()))
+                return body
+        self._store(url, fresh, headers)
+        return fresh
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def fetch(url, ttl=DEFAULT_TTL_SECONDS):
+    """Fetch `url` through the shared default HtmlCache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HtmlCache()
+    return _default_cache.fetch(url, ttl)
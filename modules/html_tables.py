@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import lxml.html
+from lxml import etree
+
+# Table extraction for the reference-site scrapers. A page is parsed once with lxml and the target
+# <table> is converted to a DataFrame straight from the element tree. The sports-reference sites ship
+# many secondary tables inside HTML comments (revealed by JavaScript), so a table that is not in the
+# live document is looked up in the comments, parsing only the comment that contains it.
+
+# The reference sites serve UTF-8; fixing the encoding keeps accented names intact when a page's
+# bytes carry no charset declaration of their own.
+PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+def parse(html):
+    """Parse a page (bytes or str) into an lxml document."""
+    if isinstance(html, str):
+        return lxml.html.fromstring(html)
+    return lxml.html.fromstring(html, parser=PARSER)
+
+def _find(doc, table_id):
+    if table_id is None:
+        return next(doc.iter("table"), None)
+    found = doc.xpath("//table[@id=$id]", id=table_id)
+    return found[0] if found else None
+
+def find_table(doc, table_id=None):
+    """The <table> element with id `table_id` (the first table if None), including commented-out tables, or None."""
+    table = _find(doc, table_id)
+    if table is not None:
+        return table
+    marker = f'id="{table_id}"' if table_id else "<table"
+    for comment in doc.iter(etree.Comment):
+        if comment.text and marker in comment.text and "<table" in comment.text:
+            table = _find(lxml.html.fromstring(comment.text), table_id)
+            if table is not None:
+                return table
+    return None
+
+def _cells(row):
+    """Text of a row's cells, with colspan cells repeated so columns stay aligned."""
+    cells = []
+    for cell in row.iterchildren("th", "td"):
+        text = cell.text_content().strip()
+        cells.extend([text] * int(cell.get("colspan", 1) or 1))
+    return cells
+
+def _infer(column):
+    # Same conversions pd.read_html applies: empty cells are NaN, numeric columns (thousands
+    # separators allowed) become numbers and anything else stays text.
+    column = column.replace("", np.nan)
+    try:
+        return pd.to_numeric(column.str.replace(",", "", regex=False))
+    except (ValueError, TypeError, AttributeError):
+        return column
+
+def table_frame(table):
+    """
+    DataFrame of a <table> element. Columns are the labels of the last header row (over-header rows
+    such as "Shooting" / "Per Game" are dropped); body and footer rows become the data, numbers parsed.
+    """
+    rows = table.xpath("./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr")
+    header_rows = table.xpath("./thead/tr")
+    if not header_rows:
+        # No <thead>: the leading rows made only of <th> cells are the header.
+        for row in rows:
+            if row.xpath("./td") or not row.xpath("./th"):
+                break
+            header_rows.append(row)
+    columns = _cells(header_rows[-1]) if header_rows else []
+    body = [row for row in rows if row not in header_rows and "thead" not in (row.get("class") or "").split()]
+    data = [_cells(row) for row in body]
+    width = max([len(columns)] + [len(row) for row in data])
+    columns = columns + [f"Unnamed: {i}" for i in range(len(columns), width)]
+    data = [row + [""] * (width - len(row)) for row in data]
+    df = pd.DataFrame(data, columns=columns, dtype=object)
+    for position in range(width):
+        df.isetitem(position, _infer(df.iloc[:, position].astype(str)))
+    return df
+
+def read_table(html, table_id=None):
+    """DataFrame of the table with id `table_id` (the first table if None) in a page, or None if there is none."""
+    table = find_table(parse(html), table_id)
+    return None if table is None else table_frame(table)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Vectorized Kelly bet sizing for the EV page. All functions take whole columns (American odds and
+# win probabilities) and return raw floats; formatting is left to the grid.
+
+def american_to_decimal(odds):
+    """Decimal odds for an array of American odds; NaN where the odds are missing, zero or not numeric."""
+    odds = pd.to_numeric(pd.Series(odds), errors="coerce").to_numpy(dtype=float)
+    odds[odds == 0] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(odds > 0, 1 + odds / 100.0, 1 + 100.0 / np.abs(odds))
+
+def american_to_prob(odds):
+    """Implied win probability for an array of American odds (NaN where the odds are not usable)."""
+    return 1 / american_to_decimal(odds)
+
+def kelly_fraction(odds, prob):
+    """
+    Full-Kelly fraction of bankroll, (b * p - (1 - p)) / b with b = decimal odds - 1, for each bet.
+    Negative-edge bets and bets with unusable odds or probabilities get 0.
+    """
+    b = american_to_decimal(odds) - 1
+    p = np.asarray(prob, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = (b * p - (1 - p)) / b
+    return np.nan_to_num(np.clip(fraction, 0, None), nan=0.0, posinf=0.0)
+
+def exclusive_kelly_fractions(odds, prob, sets, outcomes):
+    """
+    Simultaneous Kelly fractions for bets on mutually exclusive outcomes.
+    Bets sharing a `sets` label are on outcomes of which at most one can win (the sides of one market
+    line); within a set, bets sharing an `outcomes` label win together (one side at several books).
+    Each set's stakes maximize the expected log growth over which of its outcomes wins (or none of
+    them), using the closed-form solution for mutually exclusive outcomes: outcomes are taken in order
+    of expected return p * d while p * d beats the reserve rate R = (1 - sum p) / (1 - sum 1/d) of those
+    already taken, and each taken outcome gets p - R / d. Only the best-priced bet on an outcome is
+    staked. Unusable odds or probabilities get 0.
+    """
+    decimal = american_to_decimal(odds)
+    prob = np.asarray(prob, dtype=float)
+    frame = pd.DataFrame({
+        "set": pd.Series(np.asarray(sets)).fillna("").to_numpy(),
+        "outcome": pd.Series(np.asarray(outcomes)).fillna("").to_numpy(),
+        "decimal": decimal,
+        "prob": prob,
+    })
+    usable = np.isfinite(decimal) & (decimal > 1) & np.isfinite(prob) & (prob > 0) & (prob < 1)
+    fractions = np.zeros(len(frame))
+    if not usable.any():
+        return fractions
+
+    # One bet per outcome: the best price. The frame's index stays the row position.
+    frame = frame[usable]
+    best = frame.groupby(["set", "outcome"], sort=False)["decimal"].idxmax().to_numpy()
+    frame = frame.loc[best]
+    # Fair probabilities from different sources can add up to more than 1 within a set.
+    set_prob = frame.groupby("set", sort=False)["prob"].transform("sum")
+    frame = frame.assign(prob=frame["prob"] / np.maximum(set_prob, 1.0), inverse=1 / frame["decimal"])
+    frame = frame.assign(ret=frame["prob"] * frame["decimal"]).sort_values(["set", "ret"], ascending=[True, False], kind="stable")
+
+    by_set = frame.groupby("set", sort=False)
+    cum_prob = by_set["prob"].cumsum().to_numpy()
+    cum_inverse = by_set["inverse"].cumsum().to_numpy()
+    p, inverse, ret = frame["prob"].to_numpy(), frame["inverse"].to_numpy(), frame["ret"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Reserve rate before and after taking each outcome; a non-positive denominator (the taken
+        # prices already cover the whole book) leaves nothing in reserve.
+        before = np.where(1 - (cum_inverse - inverse) > 0, (1 - (cum_prob - p)) / (1 - (cum_inverse - inverse)), 0.0)
+        after = np.where(1 - cum_inverse > 0, (1 - cum_prob) / (1 - cum_inverse), 0.0)
+    # Outcomes are taken as a prefix of each set's order: stop at the first one that doesn't beat R.
+    taken = pd.Series(ret > before, index=frame.index).groupby(frame["set"].to_numpy(), sort=False).cummin().to_numpy()
+    reserve = pd.Series(np.where(taken, after, np.nan), index=frame.index).groupby(frame["set"].to_numpy(), sort=False).transform("min")
+    staked = np.where(taken, np.clip(p - reserve.to_numpy() * inverse, 0.0, None), 0.0)
+    fractions[frame.index.to_numpy()] = staked
+    return fractions
+
+def kelly_stakes(odds, prob, bankroll, multiplier=1.0, cap=None, sets=None, outcomes=None, max_total=1.0):
+    """
+    Stake in dollars for each bet: bankroll * fraction, where the fraction is the Kelly fraction
+    times `multiplier` (1, 1/2, 1/4...), limited to `cap` of the bankroll per bet if given. With
+    `sets` / `outcomes` the fractions are solved jointly per set of mutually exclusive outcomes (see
+    exclusive_kelly_fractions), and since all the bets are placed at once their total is scaled down
+    to `max_total` of the bankroll if it exceeds it.
+    """
+    if sets is None:
+        fractions = kelly_fraction(odds, prob)
+    else:
+        fractions = exclusive_kelly_fractions(odds, prob, sets, outcomes)
+    fractions = fractions * multiplier
+    if cap is not None:
+        fractions = np.minimum(fractions, cap)
+    if sets is not None and max_total is not None and fractions.sum() > max_total:
+        fractions = fractions * (max_total / fractions.sum())
+    return bankroll * fractions
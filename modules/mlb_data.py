@@ -1,17 +1,23 @@
-import urllib.request, urllib.parse, urllib.error
-from bs4 import BeautifulSoup
 import re
 import pandas as pd
-from io import StringIO
-import unicodedata
-import numpy as np
+from modules.player_names import normalize_name
+from modules.html_cache import fetch
+from modules.html_tables import parse, find_table, table_frame
+from modules.stat_frames import coerce, per_game
 
 pd.options.mode.chained_assignment = None
 
-def normalize_name(name):
-    """Normalize player names by removing accents and extra spaces."""
-    normalized = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('utf-8')
-    return normalized.strip()
+# Column dtypes of the loaded tables: counts as compact nullable integers, rates as floats.
+BATTING_SCHEMA = {
+    "G": "Int16", "AB": "Int16", "R": "Int16", "H": "Int16", "2B": "Int16", "3B": "Int16",
+    "HR": "Int16", "RBI": "Int16", "SB": "Int16", "CS": "Int16",
+    "BA": "float64", "OBP": "float64", "SLG": "float64", "OPS": "float64",
+}
+# IP is in baseball notation (6.1 = 6 1/3 innings), so it is a float.
+PITCHING_SCHEMA = {
+    "W": "Int16", "L": "Int16", "ERA": "float64", "G": "Int16", "GS": "Int16", "SV": "Int16",
+    "IP": "float64", "H": "Int16", "ER": "Int16", "BB": "Int16", "SO": "Int16", "WHIP": "float64",
+}
 
 class get_baseball_data:
     @staticmethod
@@ -21,38 +27,28 @@ class get_baseball_data:
         stats_type: "standard" (for standard batting stats) or "advanced" (for advanced stats).
         """
         url = f"https://www.baseball-reference.com/leagues/MLB/{season}-{stats_type}-batting.shtml"
-        html = urllib.request.urlopen(url)
-        soup = BeautifulSoup(html, 'html.parser')
+        html = fetch(url)
+        doc = parse(html)
         
         # Look for the table with id "players_standard_batting"
-        table = soup.find("table", {"id": "players_standard_batting"})
+        table = find_table(doc, "players_standard_batting")
         if table is None:
-            table = soup.find("table")
+            table = find_table(doc)
         
-        df = pd.read_html(StringIO(str(table)))[0]
+        df = table_frame(table)
         # Remove repeated header rows
         df = df[df["Player"] != "Player"]
         # Clean up player names
         df["Player"] = df["Player"].str.replace("*", "", regex=False)
         df["Player"] = df["Player"].apply(normalize_name)
         
-        # Convert columns to numeric where possible
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except Exception:
-                pass
-        
         # Select only the columns of interest
         cols_to_keep = ["Player", "G", "AB", "R", "H", "2B", "3B", "HR", "RBI", "SB", "CS", "BA", "OBP", "SLG", "OPS"]
         available_cols = [col for col in cols_to_keep if col in df.columns]
-        df = df[available_cols]
+        df = coerce(df[available_cols], BATTING_SCHEMA)
         
         # Normalize hitting counting stats by games played (G)
-        if "G" in df.columns:
-            for stat in ["R", "H", "2B", "3B", "HR", "RBI"]:
-                if stat in df.columns:
-                    df[stat] = df.apply(lambda row: row[stat] / row["G"] if row["G"] else np.nan, axis=1)
+        df = per_game(df, ["R", "H", "2B", "3B", "HR", "RBI"], "G")
         
         return df
 
@@ -63,38 +59,28 @@ class get_baseball_data:
         stats_type: "standard" (for standard pitching stats) or "advanced" (for advanced stats).
         """
         url = f"https://www.baseball-reference.com/leagues/MLB/{season}-{stats_type}-pitching.shtml"
-        html = urllib.request.urlopen(url)
-        soup = BeautifulSoup(html, 'html.parser')
+        html = fetch(url)
+        doc = parse(html)
         
         # Look for the pitching table by id "players_standard_pitching"
-        table = soup.find("table", {"id": "players_standard_pitching"})
+        table = find_table(doc, "players_standard_pitching")
         if table is None:
-            table = soup.find("table")
+            table = find_table(doc)
         
-        df = pd.read_html(StringIO(str(table)))[0]
+        df = table_frame(table)
         # Remove repeated header rows
         df = df[df["Player"] != "Player"]
         # Clean up player names
         df["Player"] = df["Player"].str.replace("*", "", regex=False)
         df["Player"] = df["Player"].apply(normalize_name)
         
-        # Convert columns to numeric where possible
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except Exception:
-                pass
-        
         # Select only the columns of interest
         cols_to_keep = ["Player", "W", "L", "ERA", "G", "GS", "SV", "IP", "H", "ER", "BB", "SO", "WHIP"]
         available_cols = [col for col in cols_to_keep if col in df.columns]
-        df = df[available_cols]
+        df = coerce(df[available_cols], PITCHING_SCHEMA)
         
         # Normalize pitching stats by games started (GS)
-        if "GS" in df.columns:
-            for stat in ["IP", "H", "ER", "BB", "SO"]:
-                if stat in df.columns:
-                    df[stat] = df.apply(lambda row: row[stat] / row["GS"] if row["GS"] else np.nan, axis=1)
+        df = per_game(df, ["IP", "H", "ER", "BB", "SO"], "GS")
         
         return df
 
@@ -1,17 +1,14 @@
-import urllib.request, urllib.parse, urllib.error
-from bs4 import BeautifulSoup
 import re
 import pandas as pd
-from io import StringIO
-import unicodedata
-import numpy as np
+from modules.player_names import normalize_name
+from modules.html_cache import fetch
+from modules.html_tables import parse, find_table, table_frame
+from modules.stat_frames import coerce, per_game
 
 pd.options.mode.chained_assignment = None
 
-def normalize_name(name):
-    """Normalize player names by removing accents and extra spaces."""
-    normalized = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('utf-8')
-    return normalized.strip()
+# Column dtypes of the skaters table (ATOI stays "mm:ss" text).
+SKATER_SCHEMA = {"GP": "Int16", "G": "Int16", "A": "Int16", "PTS": "Int16", "SOG": "Int16"}
 
 class get_hockey_data:
     @staticmethod
@@ -25,21 +22,17 @@ class get_hockey_data:
         Finally, convert G, A, PTS, and SOG into per-game values by dividing by GP.
         """
         url = f"https://www.hockey-reference.com/leagues/NHL_{season}_skaters.html"
-        html = urllib.request.urlopen(url)
-        soup = BeautifulSoup(html, 'html.parser')
+        html = fetch(url)
+        doc = parse(html)
         
         # Attempt to locate the main stats table.
-        table = soup.find("table", {"id": "skaters"})
+        table = find_table(doc, "skaters")
         if table is None:
             # If not found, fallback to the first table on the page
-            table = soup.find("table")
+            table = find_table(doc)
         
         # Read the table into a DataFrame.
-        df = pd.read_html(StringIO(str(table)))[0]
-        
-        # Flatten the columns if they are a MultiIndex.
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(-1)
+        df = table_frame(table)
         
         # Remove any repeated header rows (rows where "Player" is repeated).
         df = df[df["Player"] != "Player"]
@@ -48,23 +41,13 @@ class get_hockey_data:
         df["Player"] = df["Player"].str.replace("*", "", regex=False)
         df["Player"] = df["Player"].apply(normalize_name)
         
-        # Convert columns to numeric where possible.
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except Exception:
-                pass
-        
         # Select only the columns of interest.
         cols_to_keep = ["Player", "GP", "G", "A", "PTS", "SOG", "ATOI"]
         available_cols = [col for col in cols_to_keep if col in df.columns]
-        df = df[available_cols]
+        df = coerce(df[available_cols], SKATER_SCHEMA)
         
         # Convert G, A, PTS, and SOG to per-game values by dividing by GP.
-        if "GP" in df.columns:
-            for stat in ["G", "A", "PTS", "SOG"]:
-                if stat in df.columns:
-                    df[stat] = df.apply(lambda row: row[stat] / row["GP"] if row["GP"] else np.nan, axis=1)
+        df = per_game(df, ["G", "A", "PTS", "SOG"], "GP")
         
         return df
 
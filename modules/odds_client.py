@@ -0,0 +1,187 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://api.the-odds-api.com/v4"
+# Status codes worth retrying: rate limiting and transient server errors.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that paces API requests.
+    Tokens refill at `rate` per second up to `capacity`. The bucket is also fed by the
+    x-requests-remaining / x-requests-last response headers so it never hands out more
+    tokens than the remaining API quota can pay for.
+    """
+    def __init__(self, rate, capacity=None, reserve=0):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.reserve = reserve
+        self.remaining = None  # Quota credits left, as last reported by the API.
+        self.last_cost = 1.0   # Credits charged for the most recent request.
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _affordable(self):
+        if self.remaining is None:
+            return float("inf")
+        return max(0.0, (self.remaining - self.reserve) / self.last_cost)
+
+    def acquire(self):
+        """Block until a request may be sent. Returns False once the quota is spent."""
+        while True:
+            with self.lock:
+                if self._affordable() < 1:
+                    return False
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    # Charge the quota up front so in-flight requests are accounted for.
+                    if self.remaining is not None:
+                        self.remaining -= self.last_cost
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update(self, headers):
+        """Update the remaining quota from the API response headers."""
+        try:
+            remaining = float(headers.get("x-requests-remaining"))
+        except (TypeError, ValueError):
+            return
+        with self.lock:
+            try:
+                self.last_cost = max(1.0, float(headers.get("x-requests-last")))
+            except (TypeError, ValueError):
+                pass
+            self.remaining = remaining
+            self.tokens = min(self.tokens, self._affordable())
+
+def merge_event_odds(first, second):
+    """Merge two odds payloads for the same event, combining markets per bookmaker."""
+    if not first:
+        return second
+    if not second:
+        return first
+    merged = dict(first)
+    bookmakers = [dict(bookmaker, markets=list(bookmaker.get("markets", []))) for bookmaker in first.get("bookmakers", [])]
+    by_key = {bookmaker.get("key"): bookmaker for bookmaker in bookmakers}
+    for bookmaker in second.get("bookmakers", []):
+        existing = by_key.get(bookmaker.get("key"))
+        if existing is None:
+            existing = dict(bookmaker, markets=[])
+            by_key[bookmaker.get("key")] = existing
+            bookmakers.append(existing)
+        existing["markets"].extend(bookmaker.get("markets", []))
+    merged["bookmakers"] = bookmakers
+    return merged
+
+class OddsApiClient:
+    """
+    Client for The Odds API that owns one pooled keep-alive session shared by all worker threads.
+    Every request is paced by the token bucket, asks for a compressed response, and is retried
+    with jittered exponential backoff on 429/5xx responses and connection errors.
+    """
+    def __init__(self, api_key, limiter=None, pool_size=10, max_retries=4, backoff_base=0.5,
+                 backoff_cap=30.0, timeout=30):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+
+    def _backoff(self, attempt, retry_after=None):
+        # "Full jitter": sleep a random time up to the exponential ceiling, but never less than Retry-After.
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+        time.sleep(delay)
+
+    def get(self, path, params):
+        """
+        GET `path` relative to the API base URL.
+        Returns the final response (which may still be an error status), or None if the
+        quota is exhausted.
+        """
+        url = f"{BASE_URL}/{path}"
+        params = dict(params, api_key=self.api_key)
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None and not self.limiter.acquire():
+                return None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Request to {path} failed ({e}); retrying")
+                self._backoff(attempt)
+                continue
+            if self.limiter is not None:
+                self.limiter.update(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            self._backoff(attempt, response.headers.get("Retry-After"))
+        return None
+
+    def get_events(self, sport_key, params):
+        """Fetch the event list for a sport. Returns [] on failure."""
+        response = self.get(f"sports/{sport_key}/events", params)
+        if response is None:
+            print(f"API quota exhausted; skipping events for {sport_key}")
+            return []
+        if response.status_code != 200:
+            print(f"Failed to retrieve events for {sport_key}: {response.status_code} {response.text}")
+            return []
+        return response.json()
+
+    def get_sport_odds(self, sport_key, params):
+        """Fetch featured odds for every upcoming event of a sport in one request. Returns [] on failure."""
+        response = self.get(f"sports/{sport_key}/odds", params)
+        if response is None or response.status_code != 200:
+            status = "quota exhausted" if response is None else response.status_code
+            print(f"Failed to retrieve featured odds for {sport_key}: {status}")
+            return []
+        return response.json()
+
+    def get_event_odds(self, sport_key, event_id, markets, params):
+        """
+        Fetch odds for one event across `markets`.
+        If the API rejects the market list with a 422, the list is split in half and each half
+        is requested separately, so only the unsupported markets are dropped.
+        Returns the merged odds payload, or None if nothing could be retrieved.
+        """
+        markets = list(markets)
+        response = self.get(f"sports/{sport_key}/events/{event_id}/odds", dict(params, markets=",".join(markets)))
+        if response is None:
+            print(f"API quota exhausted; skipping odds for event {event_id}")
+            return None
+        if response.status_code == 422:
+            if len(markets) == 1:
+                print(f"Market {markets[0]} not available for event {event_id}")
+                return None
+            middle = len(markets) // 2
+            first = self.get_event_odds(sport_key, event_id, markets[:middle], params)
+            second = self.get_event_odds(sport_key, event_id, markets[middle:], params)
+            return merge_event_odds(first, second)
+        if response.status_code != 200:
+            print(f"Failed to retrieve odds for event {event_id}: {response.status_code} {response.text}")
+            return None
+        odds_data = response.json()
+        if isinstance(odds_data, list) and odds_data:
+            return odds_data[0]  # Assume the first item holds the odds data.
+        elif isinstance(odds_data, dict):
+            return odds_data
+        else:
+            return None
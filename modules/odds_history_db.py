@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import urllib.request
+import pandas as pd
+from modules.snapshot_store import SNAPSHOT_COLUMNS
+
+# Embedded time-series store for line-movement prices: one row per (run, outcome, bookmaker), with
+# the run time as unix seconds. Indexed for per-play range scans (unique_key / tail_key by time) and
+# per-market lookups, and run in WAL mode so the app can read while a refresh is writing.
+DB_FILE = os.getenv("ODDS_HISTORY_DB", "data/odds_history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcome_prices (
+    ts INTEGER NOT NULL,
+    unique_key TEXT NOT NULL,
+    tail_key TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    sport TEXT,
+    market TEXT,
+    outcome_name TEXT,
+    outcome_description TEXT,
+    point REAL,
+    bookmaker TEXT,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outcome_prices_key_ts ON outcome_prices (unique_key, ts);
+CREATE INDEX IF NOT EXISTS idx_outcome_prices_tail_ts ON outcome_prices (tail_key, ts);
+CREATE INDEX IF NOT EXISTS idx_outcome_prices_event_market ON outcome_prices (event_id, market);
+CREATE INDEX IF NOT EXISTS idx_outcome_prices_ts ON outcome_prices (ts);
+-- Snapshot files (see modules/snapshot_store.py) whose rows are already in outcome_prices.
+CREATE TABLE IF NOT EXISTS snapshot_files (
+    key TEXT PRIMARY KEY,
+    run TEXT NOT NULL
+);
+"""
+
+INSERT_COLUMNS = ["ts", "unique_key", "tail_key", "event_id", "sport", "market", "outcome_name",
+                  "outcome_description", "point", "bookmaker", "price"]
+
+def tail_key(unique_key):
+    """A unique key without its event id, lower-cased, so a play matches across snapshots of the same line."""
+    parts = unique_key.split("_", 1)
+    return parts[1].lower() if len(parts) == 2 else unique_key.lower()
+
+def create(path=DB_FILE):
+    """
+    Open the history database for writing, creating the file, the schema and WAL mode (which is
+    stored in the file) if needed. Writers call this once; readers use connect.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def connect(path=DB_FILE):
+    """Open an existing history database (see create) without running any DDL. Raises sqlite3.OperationalError if it is missing."""
+    uri = "file:" + urllib.request.pathname2url(os.path.abspath(path)) + "?mode=rw"
+    return sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+
+def insert_snapshot(conn, frame, files=(), run=None):
+    """
+    Bulk-insert snapshot rows (a DataFrame with SNAPSHOT_COLUMNS) in one transaction, and record
+    `files` (snapshot file keys of run `run`) as loaded.
+    """
+    keys = frame["unique_key"]
+    rows = pd.DataFrame({
+        "ts": pd.to_datetime(frame["timestamp"], utc=True).astype("int64") // 10**9,
+        "unique_key": keys,
+        "tail_key": keys.map({key: tail_key(key) for key in keys.unique()}),
+        "event_id": frame["event_id"],
+        "sport": frame["sport"],
+        "market": frame["market_key"],
+        "outcome_name": frame["outcome_name"],
+        "outcome_description": frame["outcome_description"],
+        "point": frame["point"],
+        "bookmaker": frame["bookmaker"],
+        "price": frame["price"],
+    })
+    rows = rows.astype(object).where(rows.notna(), None)
+    with conn:
+        conn.executemany(
+            f"INSERT INTO outcome_prices ({', '.join(INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(INSERT_COLUMNS))})",
+            rows.itertuples(index=False, name=None),
+        )
+        conn.executemany("INSERT OR REPLACE INTO snapshot_files (key, run) VALUES (?, ?)", [(key, run) for key in files])
+
+def loaded_files(conn):
+    """{key: run} of every snapshot file already in the database."""
+    return dict(conn.execute("SELECT key, run FROM snapshot_files"))
+
+def prune(conn, before_ts, before_run):
+    """Delete prices older than `before_ts` (unix seconds) and file records older than `before_run`."""
+    with conn:
+        conn.execute("DELETE FROM outcome_prices WHERE ts < ?", (before_ts,))
+        conn.execute("DELETE FROM snapshot_files WHERE run < ?", (before_run,))
+
+def price_history(conn, tail=None, unique_key=None, start_ts=None, end_ts=None):
+    """
+    Rows for one play, by tail_key or unique_key, in time order, optionally limited to
+    start_ts <= ts < end_ts. Returns a DataFrame with the INSERT_COLUMNS.
+    """
+    column, value = ("tail_key", tail) if tail is not None else ("unique_key", unique_key)
+    query = f"SELECT {', '.join(INSERT_COLUMNS)} FROM outcome_prices WHERE {column} = ?"
+    params = [value]
+    if start_ts is not None:
+        query += " AND ts >= ?"
+        params.append(start_ts)
+    if end_ts is not None:
+        query += " AND ts < ?"
+        params.append(end_ts)
+    return pd.read_sql_query(query + " ORDER BY ts, rowid", conn, params=params)
+
+def market_history(conn, event_id, market):
+    """Every price recorded for one event market, in time order."""
+    query = f"SELECT {', '.join(INSERT_COLUMNS)} FROM outcome_prices WHERE event_id = ? AND market = ? ORDER BY ts, rowid"
+    return pd.read_sql_query(query, conn, params=[event_id, market])
+
+def to_snapshot_frame(rows):
+    """Convert price_history rows back to snapshot rows (SNAPSHOT_COLUMNS, ISO timestamps)."""
+    frame = rows.rename(columns={"market": "market_key"})
+    frame["timestamp"] = pd.to_datetime(frame["ts"], unit="s", utc=True).map(lambda ts: ts.isoformat())
+    return frame[SNAPSHOT_COLUMNS]
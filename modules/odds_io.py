@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+import ijson
+import pandas as pd
+
+# Snapshot files are written in the format named by their extension:
+#   .json      pretty-printed JSON, for debugging
+#   .json.gz   minified, gzip-compressed JSON (nested event lists such as all_odds)
+#   .parquet   compressed columnar Parquet (flat record tables such as positive_ev_plays)
+SNAPSHOT_FORMATS = ("json", "json.gz", "parquet")
+
+def snapshot_format(path):
+    for fmt in ("json.gz", "parquet", "json"):
+        if path.endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Unsupported snapshot file {path!r}; expected one of {', '.join(SNAPSHOT_FORMATS)}.")
+
+def json_export_path(path):
+    """Path of the pretty JSON debug export that sits next to a snapshot file."""
+    fmt = snapshot_format(path)
+    return path[:-len(fmt)] + "json"
+
+def _replace_atomically(path, write):
+    # Write to a temp file first so readers (the app, the next pipeline step) never see a partial snapshot.
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_json(data, path):
+    fmt = snapshot_format(path)
+    if fmt == "json":
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=4)
+    else:
+        def write(tmp_path):
+            # mtime=0 keeps the bytes identical for identical data, so unchanged snapshots don't show up as diffs.
+            with gzip.GzipFile(tmp_path, "wb", mtime=0) as f:
+                f.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+    _replace_atomically(path, write)
+
+def write_events(events, path):
+    """Write a nested event list (all_odds) as .json or .json.gz."""
+    if snapshot_format(path) == "parquet":
+        raise ValueError("Event snapshots are nested; write them as .json or .json.gz.")
+    _write_json(events, path)
+
+def write_records(records, path):
+    """Write a list of flat records as .json, .json.gz or .parquet."""
+    if snapshot_format(path) != "parquet":
+        _write_json(records, path)
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pylist(records)
+    _replace_atomically(path, lambda tmp_path: pq.write_table(table, tmp_path, compression="zstd"))
+
+def read_frame(path):
+    """Read a record snapshot straight into a DataFrame."""
+    if snapshot_format(path) == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_json(path, orient="records", dtype=False, convert_dates=False)
+
+def _stream_items(f):
+    with f:
+        yield from ijson.items(f, "item", use_float=True)
+
+def iter_events(path):
+    """
+    Stream the events of an all_odds snapshot (.json or .json.gz) one at a time.
+    Only the current event is held in memory, however large the file is. The file is opened
+    eagerly, so a missing file raises at the call site rather than on first iteration.
+    """
+    f = gzip.open(path, "rb") if snapshot_format(path) == "json.gz" else open(path, "rb")
+    return _stream_items(f)
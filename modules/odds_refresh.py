@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+STATE_FILE = "data/odds_refresh_state.json"
+
+# Refresh cadence by time until commence_time: (hours until start or less, minutes between pulls).
+# Events further out than the last bound use DEFAULT_INTERVAL_MINUTES.
+REFRESH_TIERS = [
+    (1, 5),
+    (6, 15),
+    (24, 60),
+    (72, 180),
+]
+DEFAULT_INTERVAL_MINUTES = 360
+
+def parse_time(value):
+    """Parse an ISO timestamp from the API (trailing 'Z' allowed). Returns None if it can't be parsed."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def refresh_interval_minutes(commence_time, now):
+    """Minutes between pulls for an event starting at `commence_time`."""
+    start = parse_time(commence_time)
+    if start is None:
+        return REFRESH_TIERS[0][1]
+    hours_until_start = (start - now).total_seconds() / 3600
+    for max_hours, minutes in REFRESH_TIERS:
+        if hours_until_start <= max_hours:
+            return minutes
+    return DEFAULT_INTERVAL_MINUTES
+
+def load_state(path=STATE_FILE):
+    """Load the per-event refresh state: {event_id: {"last_fetched", "commence_time", "fingerprint"}}."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read refresh state from {path}: {e}")
+        return {}
+
+def save_state(state, path=STATE_FILE):
+    with open(path, "w") as f:
+        json.dump(state, f, indent=4, sort_keys=True)
+
+def load_previous_odds(events):
+    """Map event id -> odds payload from a previously saved all_odds event list."""
+    return {event.get("id"): event.get("odds") for event in events if event.get("id") and event.get("odds")}
+
+def featured_fingerprints(sport_odds):
+    """
+    Fingerprint each event's featured (h2h) prices from a sport-level odds response.
+    A changed fingerprint means the book has moved the line since the last pull.
+    """
+    fingerprints = {}
+    for event in sport_odds or []:
+        prices = sorted(
+            (bookmaker.get("key"), market.get("key"), outcome.get("name"), outcome.get("price"))
+            for bookmaker in event.get("bookmakers", [])
+            for market in bookmaker.get("markets", [])
+            for outcome in market.get("outcomes", [])
+        )
+        fingerprints[event.get("id")] = hashlib.sha1(json.dumps(prices).encode("utf-8")).hexdigest()
+    return fingerprints
+
+def is_due(event, state, previous_odds, fingerprints, now):
+    """Decide whether an event's odds need to be pulled again on this run."""
+    event_id = event.get("id")
+    entry = state.get(event_id)
+    if entry is None or event_id not in previous_odds:
+        return True
+    if entry.get("commence_time") != event.get("commence_time"):
+        return True
+    fingerprint = fingerprints.get(event_id)
+    if fingerprint is not None and fingerprint != entry.get("fingerprint"):
+        return True
+    last_fetched = parse_time(entry.get("last_fetched"))
+    if last_fetched is None:
+        return True
+    elapsed_minutes = (now - last_fetched).total_seconds() / 60
+    return elapsed_minutes >= refresh_interval_minutes(event.get("commence_time"), now)
+
+def plan_refresh(events, state, previous_odds, fingerprints=None, now=None):
+    """
+    Split `events` into (due, cached).
+    Cached events get their odds from `previous_odds` so the merged list keeps the all_odds.json shape.
+    """
+    now = now or datetime.now(timezone.utc)
+    fingerprints = fingerprints or {}
+    due, cached = [], []
+    for event in events:
+        if is_due(event, state, previous_odds, fingerprints, now):
+            due.append(event)
+        else:
+            event["odds"] = previous_odds[event.get("id")]
+            cached.append(event)
+    return due, cached
+
+def record_fetches(state, events, fingerprints=None, now=None):
+    """Stamp successfully fetched events in `state` and drop events that are no longer listed."""
+    now = now or datetime.now(timezone.utc)
+    fingerprints = fingerprints or {}
+    for event in events:
+        if not event.get("odds"):
+            continue
+        event_id = event.get("id")
+        state[event_id] = {
+            "last_fetched": now.isoformat(),
+            "commence_time": event.get("commence_time"),
+            "fingerprint": fingerprints.get(event_id),
+        }
+    return state
+
+def prune_state(state, live_event_ids):
+    """Remove state for events that no longer appear in the event listings."""
+    for event_id in list(state):
+        if event_id not in live_event_ids:
+            del state[event_id]
+    return state
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from modules.kelly import american_to_decimal
+
+# Parlay search for the parlay builder. Legs are scored in log space (log decimal odds and log fair
+# probability add up across legs, assuming independent legs), and combinations are grown with a beam
+# search: each round extends every kept partial parlay by every allowed leg in one vectorized step and
+# keeps the `beam_width` best by the ranking objective.
+RANK_EV = "ev"
+RANK_GROWTH = "growth"
+DEFAULT_BEAM_WIDTH = 200
+
+def american_to_decimal_bound(odds):
+    """
+    Decimal equivalent of one American odds bound, or None. Values strictly between -100 and +100
+    (including 0) are not American odds and leave the bound unset.
+    """
+    if odds is None or abs(odds) < 100:
+        return None
+    return float(american_to_decimal([odds])[0])
+
+def parlay_metrics(log_decimal, log_prob):
+    """
+    EV (as a fraction of stake), full-Kelly fraction and Kelly log growth of parlays given their summed
+    log decimal odds and log fair probabilities. Arrays in, arrays out.
+    """
+    decimal = np.exp(log_decimal)
+    prob = np.exp(log_prob)
+    ev = prob * decimal - 1
+    b = decimal - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kelly = np.clip(np.where(b > 0, ev / b, 0.0), 0.0, 1.0)
+        growth = prob * np.log1p(kelly * b) + (1 - prob) * np.log1p(-np.minimum(kelly, 1 - 1e-12))
+    return ev, kelly, np.nan_to_num(growth, nan=0.0)
+
+def _objective(log_decimal, log_prob, rank_by):
+    ev, _, growth = parlay_metrics(log_decimal, log_prob)
+    return growth if rank_by == RANK_GROWTH else ev
+
+def _reach(log_decimal, legs):
+    """
+    reach[r, i]: the largest log odds r more legs can add using positions >= i (-inf if fewer than r
+    are left). Group constraints are ignored, so this is an upper bound.
+    """
+    n = len(log_decimal)
+    reach = np.full((legs, n + 1), -np.inf)
+    reach[0] = 0.0
+    tops = []  # the legs - 1 largest log odds seen so far, descending
+    for i in range(n - 1, -1, -1):
+        tops = sorted(tops + [log_decimal[i]], reverse=True)[:legs - 1]
+        reach[1:len(tops) + 1, i] = np.cumsum(tops)
+    return reach
+
+def _search(log_decimal, log_prob, groups, legs, rank_by, max_decimal, min_decimal, beam_width):
+    """Returns (parlays, truncated), where truncated says whether the beam dropped any partial parlay."""
+    # Each beam entry: (leg positions in increasing order, summed log odds, summed log prob).
+    beam = [((), 0.0, 0.0)]
+    truncated = False
+    log_max = np.log(max_decimal) if max_decimal else np.inf
+    log_min = np.log(min_decimal) if min_decimal else -np.inf
+    reach = _reach(log_decimal, legs)
+    for depth in range(legs):
+        remaining = legs - depth - 1
+        parents, extensions, new_decimal, new_prob = [], [], [], []
+        for parent, (chosen, state_decimal, state_prob) in enumerate(beam):
+            allowed = np.arange(chosen[-1] + 1 if chosen else 0, len(log_decimal))
+            if chosen:
+                allowed = allowed[~np.isin(groups[allowed], groups[list(chosen)])]
+            d = state_decimal + log_decimal[allowed]
+            # Odds only grow as legs are added, so a partial parlay over the maximum can't recover; one
+            # that can't reach the minimum with the longest remaining legs is dropped too, so the beam
+            # isn't filled with short-odds parlays that could never qualify.
+            keep = (d <= log_max) & (d + reach[remaining, allowed + 1] >= log_min)
+            parents.append(np.full(keep.sum(), parent))
+            extensions.append(allowed[keep])
+            new_decimal.append(d[keep])
+            new_prob.append(state_prob + log_prob[allowed][keep])
+        parents, extensions = np.concatenate(parents), np.concatenate(extensions)
+        new_decimal, new_prob = np.concatenate(new_decimal), np.concatenate(new_prob)
+        if not len(parents):
+            return [], truncated
+        scores = _objective(new_decimal, new_prob, rank_by)
+        if len(scores) > beam_width:
+            truncated = True
+            best = np.argpartition(-scores, beam_width - 1)[:beam_width]
+            best = best[np.argsort(-scores[best], kind="stable")]
+        else:
+            best = np.argsort(-scores, kind="stable")
+        beam = [
+            (beam[parents[i]][0] + (int(extensions[i]),), float(new_decimal[i]), float(new_prob[i]))
+            for i in best
+        ]
+    return beam, truncated
+
+def best_parlays(plays, legs, top_k=5, rank_by=RANK_EV, one_per="event", same_book=True,
+                 min_odds=None, max_odds=None, beam_width=DEFAULT_BEAM_WIDTH):
+    """
+    The top `top_k` parlays of `legs` legs from `plays` (columns Odds, fair_prob, event, Market, Book).
+    one_per="event" allows one leg per event; "market" one leg per (event, market). With same_book all
+    legs come from one book. min_odds / max_odds bound the combined American odds. Returns a list of
+    dicts with the row positions in `plays` and the parlay's decimal odds, fair probability, EV, Kelly
+    fraction and Kelly growth, best first by `rank_by` ("ev" or "growth").
+    """
+    decimal = american_to_decimal(plays["Odds"])
+    prob = plays["fair_prob"].to_numpy(dtype=float)
+    usable = np.isfinite(decimal) & (decimal > 1) & np.isfinite(prob) & (prob > 0) & (prob < 1)
+    group_columns = ["event"] if one_per == "event" else ["event", "Market"]
+    groups = plays.groupby(group_columns, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+    books = plays["Book"].astype(object).to_numpy() if same_book else np.zeros(len(plays), dtype=object)
+    max_decimal = american_to_decimal_bound(max_odds)
+    min_decimal = american_to_decimal_bound(min_odds)
+
+    results = []
+    for book in pd.unique(books[usable]):
+        positions = np.flatnonzero(usable & (books == book))
+        if len(positions) < legs:
+            continue
+        # Search the best legs first so the beam starts from strong partial parlays.
+        positions = positions[np.argsort(-(prob[positions] * decimal[positions]), kind="stable")]
+        # The bound check can still let through partials that only fail on the group constraints; if
+        # the beam ends up empty after dropping candidates, search again with a wider one.
+        width = beam_width
+        while True:
+            found, truncated = _search(np.log(decimal[positions]), np.log(prob[positions]), groups[positions],
+                                       legs, rank_by, max_decimal, min_decimal, width)
+            if found or not truncated:
+                break
+            width *= 4
+        for chosen, log_d, log_p in found:
+            ev, kelly, growth = parlay_metrics(np.array([log_d]), np.array([log_p]))
+            results.append({
+                "rows": [int(positions[i]) for i in chosen],
+                "book": book if same_book else None,
+                "decimal": float(np.exp(log_d)),
+                "prob": float(np.exp(log_p)),
+                "ev": float(ev[0]),
+                "kelly": float(kelly[0]),
+                "growth": float(growth[0]),
+            })
+    key = "growth" if rank_by == RANK_GROWTH else "ev"
+    return sorted(results, key=lambda result: -result[key])[:top_k]
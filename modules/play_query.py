@@ -0,0 +1,40 @@
+import itertools
+import numpy as np
+
+# Query layer for the EV grid. Row positions are grouped once per (Sport, Book, Market) combination,
+# including "All" wildcards for any of the three, so applying the page's filters is a dict lookup
+# rather than boolean masks over the whole frame; the grid then only receives one page of rows.
+ALL = "All"
+FILTER_COLUMNS = ("Sport", "Book", "Market")
+DEFAULT_PAGE_SIZE = 100
+
+class PlayQuery:
+    """Precomputed filter groups and paging over a plays DataFrame."""
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.df = df
+        self.columns = columns
+        groups = df.groupby(list(columns), observed=True, sort=False, dropna=False).indices
+        buckets = {}
+        for key, positions in groups.items():
+            # Register the group under every wildcard pattern it matches, e.g. (sport, ALL, ALL).
+            for pattern in itertools.product((False, True), repeat=len(columns)):
+                wildcard = tuple(ALL if wild else value for value, wild in zip(key, pattern))
+                buckets.setdefault(wildcard, []).append(positions)
+        self.groups = {key: np.sort(np.concatenate(parts)) for key, parts in buckets.items()}
+        self.options = {column: sorted(df[column].dropna().unique().tolist()) for column in columns}
+
+    def positions(self, *values):
+        """Row positions (in frame order) matching one value or ALL per filter column."""
+        return self.groups.get(tuple(values), np.array([], dtype=np.intp))
+
+    def select(self, *values):
+        """The rows matching the filters (a copy)."""
+        return self.df.iloc[self.positions(*values)].copy()
+
+def page_count(rows, page_size=DEFAULT_PAGE_SIZE):
+    return max(1, -(-rows // page_size))
+
+def page(df, number, page_size=DEFAULT_PAGE_SIZE):
+    """Rows of page `number` (1-based) of `df`."""
+    start = (number - 1) * page_size
+    return df.iloc[start:start + page_size]
@@ -0,0 +1,128 @@
+import re
+import unicodedata
+from functools import lru_cache
+from fuzzywuzzy import fuzz
+
+# Shared player-name resolution. Odds feeds and reference sites spell names differently
+# ("R.J. Barrett" / "RJ Barrett", "Jimmy Butler III" / "Jimmy Butler", accents, nicknames), so
+# lookups go through a canonical key instead of the raw name.
+
+# Generational suffixes dropped from canonical keys.
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+
+# Canonical key of a known alias -> canonical key of the name the reference sites use.
+PLAYER_ALIASES = {
+    "bub carrington": "carlton carrington",
+}
+
+def normalize_name(name):
+    """Normalize player names by removing accents and extra spaces."""
+    normalized = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('utf-8')
+    return normalized.strip()
+
+def player_key(name, aliases=PLAYER_ALIASES):
+    """
+    Canonical lookup key for a player name: accents stripped, lower-cased, punctuation removed
+    (hyphens become spaces), generational suffixes dropped and known aliases resolved.
+    """
+    if not isinstance(name, str):
+        return ""
+    key = normalize_name(name).lower().replace("-", " ")
+    key = re.sub(r"[^a-z0-9 ]", "", key)
+    words = key.split()
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    key = " ".join(words)
+    return aliases.get(key, key)
+
+def player_keys(names, aliases=PLAYER_ALIASES):
+    """Vectorized player_key for a Series of names (each distinct name is only canonicalized once)."""
+    return names.map({name: player_key(name, aliases) for name in names.unique()})
+
+class PlayerIndex:
+    """
+    Hashed index from canonical player keys to the rows of a stats DataFrame. When several rows share
+    a key the first one wins, as with a first-match scan.
+    """
+    def __init__(self, df, column="Player", aliases=PLAYER_ALIASES):
+        self.df = df
+        self.aliases = aliases
+        self.positions = {}
+        if column in df.columns:
+            for position, key in enumerate(player_keys(df[column], aliases)):
+                if key:
+                    self.positions.setdefault(key, position)
+
+    def position(self, name):
+        """Row position of `name` in the indexed DataFrame, or None."""
+        return self.positions.get(player_key(name, self.aliases))
+
+    def lookup(self, name):
+        """The stats row of `name` as a one-row DataFrame (a copy), or an empty DataFrame."""
+        position = self.position(name)
+        if position is None:
+            return self.df.iloc[0:0].copy()
+        return self.df.iloc[[position]].copy()
+
+    def reindex(self, names):
+        """Stats rows for a Series of names, aligned with it (all-NaN rows where a name is unknown)."""
+        positions = player_keys(names, self.aliases).map(self.positions)
+        frame = self.df.reset_index(drop=True).reindex(positions.to_numpy())
+        frame.index = names.index
+        return frame
+
+@lru_cache(maxsize=None)
+def _name_score(left, right):
+    # Memoized across calls, so a multi-season pull only scores each name pair once.
+    return fuzz.ratio(left, right)
+
+def _blocking_keys(key):
+    """Candidate blocks for a canonical key: its last name, and its first and last initials."""
+    words = key.split()
+    if not words:
+        return []
+    return [("last", words[-1]), ("initials", words[0][0] + words[-1][0])]
+
+def match_names(names, candidates, threshold=80, aliases=PLAYER_ALIASES):
+    """
+    Match each name in `names` to at most one name in `candidates` and vice versa.
+    Names with the same canonical key match outright; the rest are only scored (fuzz.ratio on the
+    raw names) against candidates sharing a blocking key, and pairs scoring at least `threshold`
+    are assigned best score first. Returns {name: candidate} for the matched names.
+    """
+    names = list(dict.fromkeys(name for name in names if isinstance(name, str)))
+    candidates = list(dict.fromkeys(name for name in candidates if isinstance(name, str)))
+    matches = {}
+    taken = set()
+    by_key = {}
+    for candidate in candidates:
+        by_key.setdefault(player_key(candidate, aliases), candidate)
+    for name in names:
+        candidate = by_key.get(player_key(name, aliases))
+        if candidate is not None and candidate not in taken:
+            matches[name] = candidate
+            taken.add(candidate)
+
+    blocks = {}
+    for candidate in candidates:
+        if candidate not in taken:
+            for block in _blocking_keys(player_key(candidate, aliases)):
+                blocks.setdefault(block, []).append(candidate)
+    scored = []
+    for name in names:
+        if name in matches:
+            continue
+        seen = set()
+        for block in _blocking_keys(player_key(name, aliases)):
+            for candidate in blocks.get(block, []):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = _name_score(name, candidate)
+                if score >= threshold:
+                    scored.append((score, name, candidate))
+    for score, name, candidate in sorted(scored, key=lambda pair: -pair[0]):
+        if name not in matches and candidate not in taken:
+            matches[name] = candidate
+            taken.add(candidate)
+    return matches
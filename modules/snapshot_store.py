@@ -0,0 +1,186 @@
+import io
+import json
+import os
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+
+# Line-movement snapshots are stored as one compressed Parquet file per run and sport instead of one
+# JSON object per outcome:
+#   <prefix>date=YYYY-MM-DD/sport=<label>/<run>.parquet
+#   <prefix>date=YYYY-MM-DD/manifest.json    that day's {"key", "date", "sport", "run", "rows"}, oldest first
+# A run is a single PUT per sport plus an update of its day's manifest, and a reader fetches the
+# manifests of the days it asks for and then only the files it needs, so neither side lists or GETs
+# thousands of tiny objects, and no manifest grows past one day of runs.
+#
+# Runs written before this layout live under snapshots/<unique_key>/<run>.json, one object per
+# outcome; scripts/backfill_snapshots.py copies the recent ones over. Nothing reads that prefix any more.
+SNAPSHOT_PREFIX = "runs/"
+MANIFEST_NAME = "manifest.json"
+RUN_FORMAT = "%Y%m%dT%H%M%SZ"
+
+# One row per (run, outcome, bookmaker).
+SNAPSHOT_COLUMNS = ["timestamp", "unique_key", "event_id", "sport", "market_key", "outcome_name",
+                    "outcome_description", "point", "bookmaker", "price"]
+
+class LocalStore:
+    """Snapshot store backed by a local directory (for development and tests)."""
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, key):
+        """Return the bytes stored under `key`, or None if it does not exist."""
+        path = os.path.join(self.root, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def put(self, key, body):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        path = os.path.join(self.root, key)
+        if os.path.exists(path):
+            os.remove(path)
+
+class S3Store:
+    """Snapshot store backed by an S3 bucket; `client` is a boto3 S3 client (or anything with the same API)."""
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def put(self, key, body):
+        content_type = "application/json" if key.endswith(".json") else "application/octet-stream"
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+
+def manifest_key(day, prefix=SNAPSHOT_PREFIX):
+    return f"{prefix}date={day.strftime('%Y-%m-%d')}/{MANIFEST_NAME}"
+
+def load_manifest(store, since, until=None, prefix=SNAPSHOT_PREFIX):
+    """
+    Manifest entries of the runs at or after `since` (a UTC datetime), oldest first. Reads one
+    manifest per day from `since` through `until` (default: now).
+    """
+    until = until or datetime.now(timezone.utc)
+    entries = []
+    day = since.date()
+    while day <= until.date():
+        body = store.get(manifest_key(day, prefix))
+        if body:
+            entries.extend(json.loads(body))
+        day += timedelta(days=1)
+    return [entry for entry in entries if entry["run"] >= since.strftime(RUN_FORMAT)]
+
+def save_manifest(store, day, entries, prefix=SNAPSHOT_PREFIX):
+    store.put(manifest_key(day, prefix), json.dumps(entries, separators=(",", ":")).encode("utf-8"))
+
+def read_entry(store, entry):
+    """Read the rows of one manifest entry, or None if its file is missing from the store."""
+    body = store.get(entry["key"])
+    if body is None:
+        print(f"Snapshot {entry['key']} is in the manifest but missing from the store")
+        return None
+    return pd.read_parquet(io.BytesIO(body))
+
+def partition_key(run_time, sport, prefix=SNAPSHOT_PREFIX):
+    return f"{prefix}date={run_time.strftime('%Y-%m-%d')}/sport={sport}/{run_time.strftime(RUN_FORMAT)}.parquet"
+
+def snapshot_frame(rows, run_time):
+    """Build one run's snapshot frame from row dicts with SNAPSHOT_COLUMNS, minus the timestamp."""
+    frame = pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS[1:])
+    frame.insert(0, "timestamp", run_time.isoformat())
+    frame["sport"] = frame["sport"].fillna("Unknown")
+    # Mixed int/float/None points and prices are stored as float so every file shares one schema.
+    frame["point"] = pd.to_numeric(frame["point"], errors="coerce").astype(float)
+    frame["price"] = pd.to_numeric(frame["price"], errors="coerce").astype(float)
+    return frame
+
+def write_run_files(store, frame, run_time, prefix=SNAPSHOT_PREFIX):
+    """
+    Write one run's snapshot frame (see snapshot_frame) as one Parquet file per sport, without
+    touching the manifest. Returns the manifest entries for the files written.
+    """
+    entries = []
+    for sport, sport_rows in frame.groupby("sport", sort=False):
+        key = partition_key(run_time, sport, prefix)
+        buffer = io.BytesIO()
+        sport_rows.to_parquet(buffer, index=False, compression="zstd")
+        store.put(key, buffer.getvalue())
+        entries.append({
+            "key": key,
+            "date": run_time.strftime("%Y-%m-%d"),
+            "sport": sport,
+            "run": run_time.strftime(RUN_FORMAT),
+            "rows": len(sport_rows),
+        })
+    return entries
+
+def add_to_manifest(store, day, entries, prefix=SNAPSHOT_PREFIX):
+    """Record `entries` (all of day `day`) in that day's manifest with one read and one write."""
+    body = store.get(manifest_key(day, prefix))
+    keys = {entry["key"] for entry in entries}
+    manifest = [entry for entry in (json.loads(body) if body else []) if entry["key"] not in keys]
+    save_manifest(store, day, sorted(manifest + entries, key=lambda entry: entry["run"]), prefix)
+
+def write_snapshot(store, frame, run_time, prefix=SNAPSHOT_PREFIX):
+    """
+    Write one run's snapshot frame (see snapshot_frame) as one Parquet file per sport and record them
+    in the manifest. Returns the keys written.
+    """
+    if frame.empty:
+        return []
+    entries = write_run_files(store, frame, run_time, prefix)
+    # The manifest goes last so readers never see an entry whose file is not there yet.
+    add_to_manifest(store, run_time, entries, prefix)
+    return [entry["key"] for entry in entries]
+
+def read_snapshots(store, since, sports=None, prefix=SNAPSHOT_PREFIX):
+    """
+    Read the snapshot rows of every run at or after `since` (a UTC datetime) as one DataFrame.
+    `sports` limits the sports read.
+    """
+    entries = load_manifest(store, since, prefix=prefix)
+    if sports is not None:
+        entries = [entry for entry in entries if entry["sport"] in sports]
+    frames = [frame for frame in (read_entry(store, entry) for entry in entries) if frame is not None]
+    if not frames:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def snapshot_history(frame):
+    """
+    Group snapshot rows back into {unique_key: [snapshot, ...]} with one snapshot per run, shaped like
+    the per-outcome documents line_movement used to upload.
+    """
+    history = {}
+    frame = frame.astype(object).where(frame.notna(), None)
+    for (unique_key, timestamp), rows in frame.groupby(["unique_key", "timestamp"], sort=False):
+        first = rows.iloc[0]
+        history.setdefault(unique_key, []).append({
+            "unique_key": unique_key,
+            "event_id": first["event_id"],
+            "market_key": first["market_key"],
+            "bet_details": {
+                "outcome_name": first["outcome_name"],
+                "outcome_description": first["outcome_description"],
+                "point": first["point"],
+            },
+            "sportsbook_odds": [
+                {"bookmaker": bookmaker, "price": price}
+                for bookmaker, price in zip(rows["bookmaker"], rows["price"])
+            ],
+            "timestamp": timestamp,
+        })
+    return history
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# "Stat edge" filter for the overview page: a player prop passes when the player's season average
+# is on the bet's side of the line (above it for overs, below it for unders). Each market maps to a
+# stats source and a stat expression; plays are joined to each source with one indexed lookup on
+# canonical player keys (see modules/player_names.py).
+
+# Stat expression -> stat columns summed to get the value compared with the line.
+STAT_EXPRESSIONS = {
+    "PTS": ["PTS"],
+    "TRB": ["TRB"],
+    "AST": ["AST"],
+    "PTS+TRB+AST": ["PTS", "TRB", "AST"],
+    "3P": ["3P"],
+    "H": ["H"],
+    "SO": ["SO"],
+    "SOG": ["SOG"],
+}
+
+# Rules for plays no stat applies to.
+PASS = "pass"  # Kept regardless of stats (e.g. MLB markets other than batter/pitcher props).
+FAIL = "fail"  # Dropped (an NBA player market without a known stat).
+
+def stat_rule(sport, market):
+    """(stats source, stat expression) a play is checked against, or PASS / FAIL. Both arguments are lower-case."""
+    if sport == "nba" and market.startswith("player"):
+        if "points rebounds assists" in market or ("points" in market and "rebounds" in market and "assists" in market):
+            return ("nba", "PTS+TRB+AST")
+        if "points" in market:
+            return ("nba", "PTS")
+        if "rebounds" in market:
+            return ("nba", "TRB")
+        if "assists" in market:
+            return ("nba", "AST")
+        if "threes" in market:
+            return ("nba", "3P")
+        return FAIL
+    if sport == "mlb":
+        if market.startswith("batter"):
+            return ("mlb_batter", "H")
+        if market.startswith("pitcher"):
+            return ("mlb_pitcher", "SO")
+        return PASS
+    if sport == "nhl" and market.startswith("player"):
+        return ("nhl", "SOG")
+    return PASS
+
+def stat_edge(plays, stats):
+    """
+    Boolean Series aligned with `plays` (columns Sport, Market, Outcome, Line, Player/Team) marking the
+    plays that pass the stat edge filter. `stats` maps each source name used by stat_rule to a
+    zero-argument loader returning a PlayerIndex over that source's stats; a source is only loaded
+    when some play needs it. Plays whose line is not numeric never pass.
+    """
+    if plays.empty:
+        return pd.Series(False, index=plays.index, dtype=bool)
+    # astype(object) first: Sport and Market may be categoricals, which can't be filled with "".
+    sports = plays["Sport"].astype(object).fillna("").str.lower()
+    markets = plays["Market"].astype(object).fillna("").str.lower()
+    pairs = pd.Series(list(zip(sports, markets)), index=plays.index)
+    rules = pairs.map({pair: stat_rule(*pair) for pair in pairs.unique()})
+    line = pd.to_numeric(plays["Line"], errors="coerce")
+    over = plays["Outcome"].fillna("").str.lower().str.startswith("over")
+
+    stat_value = pd.Series(np.nan, index=plays.index)
+    checked = rules.map(lambda rule: isinstance(rule, tuple))
+    for source, source_rules in rules[checked].groupby(rules[checked].map(lambda rule: rule[0])):
+        index = stats[source]()
+        for expression, expression_rules in source_rules.groupby(source_rules.map(lambda rule: rule[1])):
+            columns = STAT_EXPRESSIONS[expression]
+            if not set(columns) <= set(index.df.columns):
+                continue
+            rows = index.reindex(plays.loc[expression_rules.index, "Player/Team"])
+            stat_value[expression_rules.index] = rows[columns].sum(axis=1, min_count=len(columns)).to_numpy()
+
+    compared = np.where(over, stat_value > line, stat_value < line)
+    passed = np.select([rules == PASS, rules == FAIL], [True, False], compared)
+    return pd.Series(passed.astype(bool), index=plays.index) & line.notna()
@@ -0,0 +1,35 @@
+import pandas as pd
+
+# Shared clean-up stage for the scraped stats tables: bulk dtype coercion against an explicit
+# schema, and per-game normalization as one vectorized division.
+
+def coerce(df, schema):
+    """
+    Convert the columns named in `schema` (column -> dtype) that are present in `df`, in one pass.
+    Values that do not parse become missing. Counts use nullable integer dtypes (e.g. "Int16"); a
+    column that turns out not to be whole numbers (a league-average footer row) is kept as float64.
+    """
+    columns = [column for column in schema if column in df.columns]
+    numeric = df[columns].apply(pd.to_numeric, errors="coerce")
+    for column in columns:
+        try:
+            numeric[column] = numeric[column].astype(schema[column])
+        except (TypeError, ValueError):
+            numeric[column] = numeric[column].astype("float64")
+    df = df.copy()
+    df[columns] = numeric
+    return df
+
+def per_game(df, stats, games):
+    """
+    Divide the `stats` columns present in `df` by the `games` column (G, GS, GP...), all at once.
+    Rows with zero or missing games get NaN. Returns a new DataFrame.
+    """
+    columns = [column for column in stats if column in df.columns]
+    if games not in df.columns or not columns:
+        return df
+    denominator = df[games].astype("float64")
+    denominator = denominator.where(denominator != 0)
+    df = df.copy()
+    df[columns] = df[columns].astype("float64").div(denominator, axis=0)
+    return df
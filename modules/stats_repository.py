@@ -0,0 +1,93 @@
+import os
+import threading
+import pandas as pd
+from modules.player_names import PlayerIndex
+
+# Player season stats for the app, keyed by (sport, role, season). The scripts in scripts/ write the
+# stats as pretty-printed JSON once a day; the repository converts each file once into a compact
+# Parquet copy (float32 numbers, categorical names) under STATS_CACHE_DIR and keeps the frame and its
+# PlayerIndex in memory until the source file's mtime changes.
+STATS_FILES = {
+    ("nba", "player", 2024): "data/nba_stats_2024_pretty.json",
+    ("nba", "player", 2025): "data/nba_stats_2025_pretty.json",
+    ("mlb", "batter", 2024): "data/mlb_batter_stats_pretty.json",
+    ("mlb", "batter", 2025): "data/mlb_batter_stats_2025_pretty.json",
+    ("mlb", "pitcher", 2024): "data/mlb_pitcher_stats_pretty.json",
+    ("mlb", "pitcher", 2025): "data/mlb_pitcher_stats_2025_pretty.json",
+    ("nhl", "skater", 2024): "data/nhl_skater_stats_2024_pretty.json",
+    ("nhl", "skater", 2025): "data/nhl_skater_stats_2025_pretty.json",
+}
+STATS_CACHE_DIR = os.getenv("STATS_CACHE_DIR", "data/stats_cache")
+# Parquet metadata key holding the mtime of the JSON file a cache file was built from.
+SOURCE_MTIME_KEY = b"source_mtime_ns"
+
+def compact_frame(df):
+    """Stats frame with compact dtypes: numbers as float32, player names as categorical."""
+    df = df.copy()
+    for column in df.columns:
+        if column == "Player":
+            df[column] = df[column].astype("category")
+        elif pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].astype("float32")
+    return df
+
+class StatsRepository:
+    """Typed player-stats frames and player indexes, reloaded when their source file changes."""
+    def __init__(self, files=STATS_FILES, cache_dir=STATS_CACHE_DIR):
+        self.files = files
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        # (sport, role, season) -> (source mtime, frame, PlayerIndex)
+        self.loaded = {}
+
+    def _cache_path(self, key):
+        sport, role, season = key
+        return os.path.join(self.cache_dir, f"{sport}_{role}_{season}.parquet")
+
+    def _read_cache(self, key, mtime):
+        import pyarrow.parquet as pq
+        try:
+            table = pq.read_table(self._cache_path(key))
+        except (OSError, ValueError):
+            return None
+        if (table.schema.metadata or {}).get(SOURCE_MTIME_KEY) != str(mtime).encode():
+            return None
+        return table.to_pandas()
+
+    def _write_cache(self, key, mtime, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_MTIME_KEY: str(mtime).encode()})
+        path = self._cache_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pq.write_table(table, path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            # A read-only checkout still works; it just converts the JSON on every load.
+            print(f"Could not write stats cache {path}: {e}")
+
+    def _load(self, key):
+        path = self.files[key]
+        mtime = os.stat(path).st_mtime_ns
+        entry = self.loaded.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry
+        df = self._read_cache(key, mtime)
+        if df is None:
+            df = compact_frame(pd.read_json(path, orient="records", dtype=False))
+            self._write_cache(key, mtime, df)
+        entry = (mtime, df, PlayerIndex(df))
+        self.loaded[key] = entry
+        return entry
+
+    def frame(self, sport, role, season):
+        """Stats of one (sport, role, season) as a typed DataFrame. Raises KeyError / OSError for unknown or missing files."""
+        with self.lock:
+            return self._load((sport, role, season))[1]
+
+    def index(self, sport, role, season):
+        """PlayerIndex over the stats of one (sport, role, season)."""
+        with self.lock:
+            return self._load((sport, role, season))[2]
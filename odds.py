@@ -1,7 +1,10 @@
 import os
-import requests
-import json
 import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.odds_client import OddsApiClient, TokenBucket
+from modules import odds_refresh
+from modules.odds_io import iter_events, write_events, json_export_path
 
 # Retrieve the API key from an environment variable,
 # falling back to a hardcoded API key if not found.
@@ -29,54 +32,103 @@ STANDARD_MARKETS = {"h2h", "spreads", "totals", "alternate_spreads", "alternate_
                     "h2h_h1", "h2h_q1", "h2h_p1", "h2h_1st_5_innings", "team_totals", "totals_1st_1_innings"}
 ODDS_FORMAT = "american"  # Options: "american" or "decimal"
 DATE_FORMAT = "iso"
-BOOKMAKERS = "pinnacle,fanduel,draftkings,betmgm,espnbet,williamhill_us,betonlinag,lowvig,betrivers,hardrockbet"
+BOOKMAKERS = "pinnacle,fanduel,draftkings,betmgm,espnbet,williamhill_us,betonlineag,lowvig,betrivers,hardrockbet"
 EVENT_ODDS_FLAG = "true"
+OUTPUT_FILE = "data/all_odds.json.gz"
+# Also write a pretty-printed data/all_odds.json for debugging.
+EXPORT_JSON = os.getenv("EXPORT_JSON", "false").lower() == "true"
+# Only re-pull events that are due on their tiered cadence (see modules/odds_refresh.py) or whose
+# featured odds moved. Set ODDS_FULL_REFRESH=true to re-pull every event.
+INCREMENTAL_REFRESH = os.getenv("ODDS_FULL_REFRESH", "false").lower() != "true"
+
+# ===== Fetch Pacing =====
+# CONCURRENT_FETCH pulls event odds from a worker pool; set ODDS_CONCURRENT=false to fetch one event at a time.
+CONCURRENT_FETCH = os.getenv("ODDS_CONCURRENT", "true").lower() != "false"
+MAX_WORKERS = int(os.getenv("ODDS_MAX_WORKERS", "8"))
+MAX_REQUESTS_PER_SECOND = float(os.getenv("ODDS_MAX_RPS", "5"))
+# Quota credits to leave untouched so manual runs still work after the scheduled refresh.
+QUOTA_RESERVE = int(os.getenv("ODDS_QUOTA_RESERVE", "0"))
+
+RATE_LIMITER = TokenBucket(MAX_REQUESTS_PER_SECOND, reserve=QUOTA_RESERVE)
+# One pooled keep-alive session shared by every worker thread.
+CLIENT = OddsApiClient(API_KEY, limiter=RATE_LIMITER, pool_size=MAX_WORKERS)
 
 def pull_events(sport_key, accepted_markets):
     """Fetch events for a given sport."""
-    url = f"https://api.the-odds-api.com/v4/sports/{sport_key}/events"
     params = {
-        "api_key": API_KEY,
         "regions": "us,eu",
         "markets": ",".join(accepted_markets),
         "oddsFormat": ODDS_FORMAT,
         "dateFormat": DATE_FORMAT,
     }
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        print(f"Failed to retrieve events for {sport_key}: {response.status_code} {response.text}")
-        return []
-    return response.json()
+    return CLIENT.get_events(sport_key, params)
 
 def pull_event_odds(sport_key, event_id, accepted_markets):
     """Fetch odds for a specific event."""
-    url = f"https://api.the-odds-api.com/v4/sports/{sport_key}/events/{event_id}/odds"
     params = {
-        "api_key": API_KEY,
         "regions": "us,eu",
-        "markets": ",".join(accepted_markets),
         "oddsFormat": ODDS_FORMAT,
         "dateFormat": DATE_FORMAT,
         "bookmakers": BOOKMAKERS,
         "eventOdds": EVENT_ODDS_FLAG
     }
-    response = requests.get(url, params=params)
-    if response.status_code == 422:
-        params["markets"] = "h2h,spreads,totals"
-        response = requests.get(url, params=params)
-    if response.status_code != 200:
-        print(f"Failed to retrieve odds for event {event_id}: {response.status_code} {response.text}")
-        return None
-    odds_data = response.json()
-    if isinstance(odds_data, list) and odds_data:
-        return odds_data[0]  # Assume the first item holds the odds data.
-    elif isinstance(odds_data, dict):
-        return odds_data
-    else:
-        return None
+    return CLIENT.get_event_odds(sport_key, event_id, sorted(accepted_markets), params)
+
+def pull_featured_odds(sport_key):
+    """Fetch the h2h odds of every event for a sport in one request, used to detect line moves."""
+    params = {
+        "regions": "us,eu",
+        "markets": "h2h",
+        "oddsFormat": ODDS_FORMAT,
+        "dateFormat": DATE_FORMAT,
+        "bookmakers": BOOKMAKERS,
+    }
+    return CLIENT.get_sport_odds(sport_key, params)
+
+def load_previous_odds(path=OUTPUT_FILE):
+    """Map event id -> odds from the file saved by the previous run, or {} if there is no usable file."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        return odds_refresh.load_previous_odds(iter_events(path))
+    except Exception as e:
+        print(f"Could not read previous odds from {path}: {e}")
+        return {}
+
+def fetch_event_odds(jobs, concurrent=CONCURRENT_FETCH, max_workers=MAX_WORKERS):
+    """
+    Attach odds to every event in `jobs`, a list of (sport_key, event, accepted_markets) tuples.
+    Requests are paced by RATE_LIMITER; in concurrent mode up to `max_workers` run at once.
+    Events are updated in place, so the caller's ordering is preserved.
+    """
+    if not concurrent:
+        for sport_key, event, accepted_markets in jobs:
+            event["odds"] = pull_event_odds(sport_key, event.get("id"), accepted_markets)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(pull_event_odds, sport_key, event.get("id"), accepted_markets): event
+            for sport_key, event, accepted_markets in jobs
+        }
+        for future in as_completed(futures):
+            event = futures[future]
+            try:
+                event["odds"] = future.result()
+            except Exception as e:
+                print(f"Error fetching odds for event {event.get('id')}: {e}")
+                event["odds"] = None
 
 def main():
     all_events = []
+    jobs = []
+    fingerprints = {}
+    now = datetime.now(timezone.utc)
+    if INCREMENTAL_REFRESH:
+        state = odds_refresh.load_state()
+        previous_odds = load_previous_odds()
+    else:
+        state, previous_odds = {}, {}
     # Loop over each sport in the configuration and fetch events.
     for sport_label, config in SPORTS_CONFIG.items():
         sport_key = config["sport_key"]
@@ -89,18 +141,35 @@ def main():
             for event in events:
                 # Add the sport label for later context.
                 event["sport_label"] = sport_label
-                # Fetch and attach full odds data for this event.
-                odds = pull_event_odds(sport_key, event.get("id"), accepted_markets)
-                event["odds"] = odds
                 all_events.append(event)
-                # Sleep briefly to avoid API rate limits.
-                time.sleep(1)
+            if INCREMENTAL_REFRESH:
+                sport_fingerprints = odds_refresh.featured_fingerprints(pull_featured_odds(sport_key))
+                fingerprints.update(sport_fingerprints)
+                events, cached = odds_refresh.plan_refresh(events, state, previous_odds, sport_fingerprints, now)
+                print(f"{len(events)} {sport_label} events due for refresh, {len(cached)} reused from the last run")
+            for event in events:
+                jobs.append((sport_key, event, accepted_markets))
         else:
             print(f"No events returned for {sport_label}")
-    # Save all events (with full odds data) to a single JSON file.
-    with open("data/all_odds.json", "w") as f:
-        json.dump(all_events, f, indent=4)
-    print("All odds (with events and bookmakers data) saved to all_odds.json")
+    # Fetch and attach full odds data for every event that is due.
+    start = time.monotonic()
+    fetch_event_odds(jobs)
+    print(f"Fetched odds for {len(jobs)} events in {time.monotonic() - start:.1f}s")
+    if INCREMENTAL_REFRESH:
+        fetched = [event for _, event, _ in jobs]
+        odds_refresh.record_fetches(state, fetched, fingerprints, now)
+        odds_refresh.prune_state(state, {event.get("id") for event in all_events})
+        # A failed pull falls back to the last good odds for that event; its state is left
+        # untouched so it is retried on the next run.
+        for event in fetched:
+            if not event.get("odds") and event.get("id") in previous_odds:
+                event["odds"] = previous_odds[event.get("id")]
+        odds_refresh.save_state(state)
+    # Save all events (with full odds data) to a single compressed snapshot.
+    write_events(all_events, OUTPUT_FILE)
+    if EXPORT_JSON:
+        write_events(all_events, json_export_path(OUTPUT_FILE))
+    print(f"All odds (with events and bookmakers data) saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
     main()
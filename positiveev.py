@@ -1,8 +1,11 @@
-import json
 import pandas as pd
 import os
 from datetime import datetime, timezone
 import math
+import numpy as np
+from modules.ev_engine import process_all_odds_vectorized
+from modules.fair_price import book_weight, devig_consensus
+from modules.odds_io import iter_events, write_records, json_export_path
 
 # ----- Odds Conversion Helpers -----
 def american_to_implied_prob(odds):
@@ -58,104 +61,218 @@ def calculate_ev(fair_prob, sportsbook_odds):
     profit_if_win = american_to_profit(sportsbook_odds)
     return round((fair_prob * profit_if_win) - (1 - fair_prob) * 100, 4)
 
-def aggregate_odds_for_play(event, market_key, team, point, description):
-    aggregated = []
-    for bookmaker in event.get("odds", {}).get("bookmakers", []):
-        bk = bookmaker.get("key")
-        for market in bookmaker.get("markets", []):
-            if market.get("key") != market_key:
+# ----- Indexed Event Representation -----
+PLAYER_MARKET_PREFIXES = ("player", "batter", "pitcher", "team")
+LINE_MARKET_PREFIXES = ("spreads", "alternate_spreads", "totals", "alternate_totals")
+
+def play_key(market_key, team, point, description):
+    """
+    Key identifying the same play across bookmakers.
+    Line markets match on point, player/team markets on description and point, everything else on name only.
+    """
+    if market_key.startswith(LINE_MARKET_PREFIXES):
+        return (market_key, team, point)
+    if market_key.startswith(PLAYER_MARKET_PREFIXES):
+        return (market_key, team, description, point)
+    return (market_key, team)
+
+def two_sided_lines(market_key, outcomes, home_team):
+    """
+    Split one bookmaker's market into its two-sided lines, as (side_a, side_b) outcome pairs.
+    h2h pairs the whole market, spreads pair opposite points of the two teams, totals pair Over/Under
+    at a point and player/team markets pair Over/Under per description and point.
+    """
+    if market_key.startswith("h2h"):
+        groups = {None: outcomes}
+    elif market_key.startswith(("spreads", "alternate_spreads")):
+        # Key each side by the line from the home team's perspective so -3.5 / +3.5 land together.
+        groups = {}
+        for outcome in outcomes:
+            point = outcome.get("point")
+            if point is None:
                 continue
-            for outcome in market.get("outcomes", []):
-                if outcome.get("name") != team:
-                    continue
-                if market_key.startswith(("spreads", "alternate_spreads", "totals", "alternate_totals")):
-                    if outcome.get("point") != point:
-                        continue
-                if market_key.startswith(("player", "batter", "pitcher", "team")):
-                    if outcome.get("description") != description or outcome.get("point") != point:
-                        continue
-                aggregated.append({
-                    "bookmaker": bk,
-                    "price": outcome.get("price"),
-                    "point": outcome.get("point"),
-                    "description": outcome.get("description")
-                })
-    return aggregated
+            line = point if outcome.get("name") == home_team else -point
+            groups.setdefault(line, []).append(outcome)
+    elif market_key.startswith(("totals", "alternate_totals")):
+        groups = {}
+        for outcome in outcomes:
+            groups.setdefault(outcome.get("point"), []).append(outcome)
+    elif market_key.startswith(PLAYER_MARKET_PREFIXES):
+        groups = {}
+        for outcome in outcomes:
+            groups.setdefault((outcome.get("description"), outcome.get("point")), []).append(outcome)
+    else:
+        return []
+    return [
+        (group[0], group[1]) for group in groups.values()
+        if len(group) == 2 and group[0].get("name") != group[1].get("name")
+        and group[0].get("price") is not None and group[1].get("price") is not None
+    ]
 
-# ----- Helper: Determine Fair Probability & Market Width from Pinnacle -----
-def determine_fair_prob_and_width(event, market_key, team, point, description, outcome_name):
+class EventIndex:
     """
-    Loop through the event's bookmakers to find the Pinnacle odds for the given market.
-    If Pinnacle is unavailable, calculate the fair probability and market width using the aggregated odds.
-    Returns a tuple (fair_prob, market_width) if successfully determined, or (None, None) otherwise.
+    One-pass index over an event's bookmakers, markets and outcomes.
+    Building it walks the event once; fair-prob, market-width and aggregated-odds lookups are
+    then dictionary hits instead of re-scanning every bookmaker for every outcome.
     """
-    fair_prob = None
-    market_width = None
-    pinnacle_outcomes = None
-    aggregated_outcomes = []
-
-    # Look for the Pinnacle bookmaker
-    for pin_book in event.get("odds", {}).get("bookmakers", []):
-        if pin_book.get("key") == "pinnacle":
-            for pin_market in pin_book.get("markets", []):
-                if pin_market.get("key") == market_key:
-                    pinnacle_outcomes = pin_market.get("outcomes", [])
-                    break
-
-    # If Pinnacle is available, use its odds
-    if pinnacle_outcomes:
-        # For head-to-head markets
+    def __init__(self, event):
+        self.pinnacle_markets = {}  # market_key -> Pinnacle outcomes (first market with that key)
+        self.pinnacle_points = {}   # (market_key, point) -> Pinnacle outcomes at that point
+        self.pinnacle_props = {}    # (market_key, point, description) -> Pinnacle outcomes for that player line
+        self.outcomes_by_name = {}  # (market_key, name) -> outcomes from every bookmaker, in feed order
+        self.plays = {}             # play_key -> aggregated odds entries, in feed order
+        self.markets_by_key = {}    # market_key -> [(bookmaker key, outcomes)] for consensus pricing
+        self.home_team = event.get("home_team")
+        self.fair_cache = {}
+        self.consensus_cache = {}
+
+        for bookmaker in (event.get("odds") or {}).get("bookmakers", []):
+            bk = bookmaker.get("key")
+            pinnacle_seen = set()
+            for market in bookmaker.get("markets", []):
+                market_key = market.get("key")
+                outcomes = market.get("outcomes", [])
+                if bk == "pinnacle" and market_key not in pinnacle_seen:
+                    pinnacle_seen.add(market_key)
+                    self.pinnacle_markets[market_key] = outcomes
+                self.markets_by_key.setdefault(market_key, []).append((bk, outcomes))
+                for outcome in outcomes:
+                    name = outcome.get("name")
+                    point = outcome.get("point")
+                    description = outcome.get("description")
+                    self.outcomes_by_name.setdefault((market_key, name), []).append(outcome)
+                    self.plays.setdefault(play_key(market_key, name, point, description), []).append({
+                        "bookmaker": bk,
+                        "price": outcome.get("price"),
+                        "point": point,
+                        "description": description
+                    })
+
+        # Group the chosen Pinnacle markets by line so the two sides of a line are one lookup away.
+        for market_key, outcomes in self.pinnacle_markets.items():
+            for outcome in outcomes:
+                point = outcome.get("point")
+                self.pinnacle_points.setdefault((market_key, point), []).append(outcome)
+                self.pinnacle_props.setdefault((market_key, point, outcome.get("description")), []).append(outcome)
+
+    def _pinnacle_line(self, market_key, team, point, description, outcome_name):
+        """Return the Pinnacle outcomes to de-vig and the name that selects our side, or (None, None)."""
+        pinnacle_outcomes = self.pinnacle_markets.get(market_key)
+        if not pinnacle_outcomes:
+            return None, None
         if market_key.startswith("h2h") and len(pinnacle_outcomes) == 2:
-            fair_prob1, fair_prob2, _ = calculate_no_vig_probabilities(pinnacle_outcomes)
-            fair_prob = fair_prob1 if pinnacle_outcomes[0].get("name") == team else fair_prob2
-            market_width = calculate_market_width(pinnacle_outcomes)
-        # For spreads or alternate spreads
+            return pinnacle_outcomes, team
         elif market_key in {"spreads", "alternate_spreads"}:
-            valid_outcomes = [o for o in pinnacle_outcomes if o.get("point") == point]
-            if len(valid_outcomes) == 2:
-                fair_prob1, fair_prob2, _ = calculate_no_vig_probabilities(valid_outcomes)
-                fair_prob = fair_prob1 if valid_outcomes[0].get("name") == team else fair_prob2
-                market_width = calculate_market_width(valid_outcomes)
-        # For totals or alternate totals
+            return self.pinnacle_points.get((market_key, point), []), team
         elif market_key.startswith(("totals", "alternate_totals")):
-            valid_outcomes = [o for o in pinnacle_outcomes if o.get("point") == point]
-            if len(valid_outcomes) == 2:
-                fair_prob1, fair_prob2, _ = calculate_no_vig_probabilities(valid_outcomes)
-                fair_prob = fair_prob1 if valid_outcomes[0].get("name") == outcome_name else fair_prob2
-                market_width = calculate_market_width(valid_outcomes)
-        # For player-specific markets
-        elif market_key.startswith(("player", "batter", "pitcher", "team")):
-            valid_outcomes = [o for o in pinnacle_outcomes if o.get("point") == point and o.get("description") == description]
-            if len(valid_outcomes) == 2:
-                fair_prob1, fair_prob2, _ = calculate_no_vig_probabilities(valid_outcomes)
-                fair_prob = fair_prob1 if valid_outcomes[0].get("name") == outcome_name else fair_prob2
-                market_width = calculate_market_width(valid_outcomes)
-
-    # If Pinnacle is not available, calculate using average odds
-    if fair_prob is None:
-        for bookmaker in event.get("odds", {}).get("bookmakers", []):
-            for market in bookmaker.get("markets", []):
-                if market.get("key") != market_key:
-                    continue
-                for outcome in market.get("outcomes", []):
-                    if outcome.get("name") == team:
-                        aggregated_outcomes.append(outcome)
+            return self.pinnacle_points.get((market_key, point), []), outcome_name
+        elif market_key.startswith(PLAYER_MARKET_PREFIXES):
+            return self.pinnacle_props.get((market_key, point, description), []), outcome_name
+        return None, None
+
+    def consensus(self, market_key):
+        """
+        Multi-book no-vig consensus for every play in a market, computed once per market.
+        Each book's two-sided lines are de-vigged (multiplicative, power and Shin, averaged) and the
+        books are combined with a weighted average favouring sharp books. Returns
+        {play_key: (fair_prob, market_width)}, where the width comes from the most heavily weighted book.
+        """
+        if market_key in self.consensus_cache:
+            return self.consensus_cache[market_key]
+
+        pairs = []
+        for bk, outcomes in self.markets_by_key.get(market_key, []):
+            for side_a, side_b in two_sided_lines(market_key, outcomes, self.home_team):
+                pairs.append((bk, side_a, side_b))
+        consensus = {}
+        if pairs:
+            fair_a, fair_b = devig_consensus(
+                np.array([american_to_implied_prob(side_a.get("price")) for _, side_a, _ in pairs]),
+                np.array([american_to_implied_prob(side_b.get("price")) for _, _, side_b in pairs]),
+            )
+            totals = {}  # play_key -> [weight sum, weighted prob sum, heaviest weight, its width]
+            for (bk, side_a, side_b), prob_a, prob_b in zip(pairs, fair_a, fair_b):
+                weight = book_weight(bk)
+                width = calculate_market_width([side_a, side_b])
+                for outcome, prob in ((side_a, prob_a), (side_b, prob_b)):
+                    key = play_key(market_key, outcome.get("name"), outcome.get("point"), outcome.get("description"))
+                    entry = totals.setdefault(key, [0.0, 0.0, -1.0, None])
+                    entry[0] += weight
+                    entry[1] += weight * float(prob)
+                    if weight > entry[2]:
+                        entry[2], entry[3] = weight, width
+            consensus = {key: (entry[1] / entry[0], entry[3]) for key, entry in totals.items()}
+        self.consensus_cache[market_key] = consensus
+        return consensus
+
+    def fair_prob_and_width(self, market_key, team, point, description, outcome_name):
+        """
+        Indexed equivalent of determine_fair_prob_and_width, memoized per play.
+        Fair probability comes from Pinnacle when it has the line, then from the multi-book consensus,
+        and finally from the average implied probability of this side across books.
+        """
+        cache_key = (market_key, team, point, description, outcome_name)
+        if cache_key in self.fair_cache:
+            return self.fair_cache[cache_key]
+
+        fair_prob = None
+        market_width = None
+
+        # If Pinnacle is available, use its odds
+        valid_outcomes, side = self._pinnacle_line(market_key, team, point, description, outcome_name)
+        if valid_outcomes is not None and len(valid_outcomes) == 2:
+            fair_prob1, fair_prob2, _ = calculate_no_vig_probabilities(valid_outcomes)
+            fair_prob = fair_prob1 if valid_outcomes[0].get("name") == side else fair_prob2
+            market_width = calculate_market_width(valid_outcomes)
+
+        # If Pinnacle is not available, use the de-vigged consensus of every book pricing both sides.
+        if fair_prob is None:
+            consensus = self.consensus(market_key).get(play_key(market_key, team, point, description))
+            if consensus is not None:
+                fair_prob, market_width = consensus
+
+        # Last resort: the average implied probability of this side alone (still includes the vig).
+        if fair_prob is None:
+            aggregated_outcomes = self.outcomes_by_name.get((market_key, team), [])
+            if aggregated_outcomes:
+                total_prob = sum(american_to_implied_prob(outcome.get("price")) for outcome in aggregated_outcomes)
+                fair_prob = total_prob / len(aggregated_outcomes)
+
+                # Calculate market width as the difference between the highest and lowest odds
+                prices = [abs(outcome.get("price")) for outcome in aggregated_outcomes if outcome.get("price") is not None]
+                if prices:
+                    market_width = round(max(prices) - min(prices), 2)
+
+        self.fair_cache[cache_key] = (fair_prob, market_width)
+        return fair_prob, market_width
 
-        # Calculate fair probability and market width from aggregated outcomes
-        if aggregated_outcomes:
-            total_prob = sum(american_to_implied_prob(outcome.get("price")) for outcome in aggregated_outcomes)
-            fair_prob = total_prob / len(aggregated_outcomes)
+    def aggregated_odds(self, market_key, team, point, description):
+        """Every bookmaker's price for the same play, as aggregate_odds_for_play returns it."""
+        return [dict(entry) for entry in self.plays.get(play_key(market_key, team, point, description), [])]
 
-            # Calculate market width as the difference between the highest and lowest odds
-            prices = [abs(outcome.get("price")) for outcome in aggregated_outcomes if outcome.get("price") is not None]
-            if prices:
-                market_width = round(max(prices) - min(prices), 2)
+def aggregate_odds_for_play(event, market_key, team, point, description):
+    return EventIndex(event).aggregated_odds(market_key, team, point, description)
 
-    return fair_prob, market_width
+# ----- Helper: Determine Fair Probability & Market Width from Pinnacle -----
+def determine_fair_prob_and_width(event, market_key, team, point, description, outcome_name):
+    """
+    Loop through the event's bookmakers to find the Pinnacle odds for the given market.
+    If Pinnacle is unavailable, use the multi-book no-vig consensus, then the aggregated odds.
+    Returns a tuple (fair_prob, market_width) if successfully determined, or (None, None) otherwise.
+    For many lookups on one event, build an EventIndex once and query it instead.
+    """
+    return EventIndex(event).fair_prob_and_width(market_key, team, point, description, outcome_name)
 
 # ----- Main Processing Function for All Odds -----
-INPUT_FILE = "data/all_odds.json"
-OUTPUT_FILE = "data/positive_ev_plays.json"
+INPUT_FILE = "data/all_odds.json.gz"
+OUTPUT_FILE = "data/positive_ev_plays.parquet"
+# Every book's price for each play, one row per (unique_id, bookmaker), kept out of the plays table so
+# the app only loads it for the play being inspected.
+BOOK_PRICES_FILE = "data/book_prices.parquet"
+# Also write a pretty-printed data/positive_ev_plays.json for debugging.
+EXPORT_JSON = os.getenv("EXPORT_JSON", "false").lower() == "true"
+# "scalar" walks each event through an EventIndex; "vectorized" uses the columnar engine in modules/ev_engine.py.
+EV_ENGINE = os.getenv("EV_ENGINE", "scalar")
 
 def process_all_odds(data):
     ev_plays = {}
@@ -177,8 +294,9 @@ def process_all_odds(data):
         sport = event.get("sport_label")
         home_team = event.get("home_team")
         away_team = event.get("away_team")
+        index = EventIndex(event)
 
-        for bookmaker in event.get("odds", {}).get("bookmakers", []):
+        for bookmaker in (event.get("odds") or {}).get("bookmakers", []):
             book_key = bookmaker.get("key")
             if book_key in {"lowvig", "pinnacle"}:
                 continue
@@ -193,8 +311,8 @@ def process_all_odds(data):
                         continue
 
                     # Determine fair probability and market width from Pinnacle data.
-                    fair_prob, market_width = determine_fair_prob_and_width(
-                        event, market_key, team, point, description, outcome.get("name")
+                    fair_prob, market_width = index.fair_prob_and_width(
+                        market_key, team, point, description, outcome.get("name")
                     )
 
                     # If fair_prob could not be determined, skip this outcome.
@@ -227,7 +345,7 @@ def process_all_odds(data):
                                     "fair_american_odds": no_vig_american_odds(fair_prob),
                                     "ev": round(ev, 2),
                                     "market_width": market_width,
-                                    "aggregated_odds": aggregate_odds_for_play(event, market_key, team, point, description)
+                                    "aggregated_odds": index.aggregated_odds(market_key, team, point, description)
                                 }
                         else:
                             ev_plays[unique_id] = {
@@ -246,18 +364,47 @@ def process_all_odds(data):
                                 "fair_american_odds": no_vig_american_odds(fair_prob),
                                 "ev": round(ev, 2),
                                 "market_width": market_width,
-                                "aggregated_odds": aggregate_odds_for_play(event, market_key, team, point, description)
+                                "aggregated_odds": index.aggregated_odds(market_key, team, point, description)
                             }
     # Return only the highest EV plays
     return list(ev_plays.values())
 
-def main():
-    with open(INPUT_FILE, "r") as f:
-        data = json.load(f)
-    results = process_all_odds(data)
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(results, f, indent=4)
-    print(f"Saved {len(results)} positive EV plays to {OUTPUT_FILE}")
+def split_book_prices(plays):
+    """
+    Split each play's aggregated_odds into long-format rows (unique_id, bookmaker, price, point, description).
+    Returns (plays without aggregated_odds, book price rows).
+    """
+    book_prices = []
+    slim_plays = []
+    for play in plays:
+        play = dict(play)
+        for entry in play.pop("aggregated_odds", None) or []:
+            book_prices.append({
+                "unique_id": play["unique_id"],
+                "bookmaker": entry.get("bookmaker"),
+                "price": entry.get("price"),
+                "point": entry.get("point"),
+                "description": entry.get("description"),
+            })
+        slim_plays.append(play)
+    return slim_plays, book_prices
+
+def main(engine=EV_ENGINE):
+    # Stream events from disk so peak memory doesn't grow with the size of the odds snapshot.
+    data = iter_events(INPUT_FILE)
+    if engine == "vectorized":
+        results = process_all_odds_vectorized(data)
+    elif engine == "scalar":
+        results = process_all_odds(data)
+    else:
+        raise ValueError(f"Unknown EV engine {engine!r}; expected 'scalar' or 'vectorized'.")
+    plays, book_prices = split_book_prices(results)
+    write_records(plays, OUTPUT_FILE)
+    write_records(book_prices, BOOK_PRICES_FILE)
+    if EXPORT_JSON:
+        write_records(plays, json_export_path(OUTPUT_FILE))
+        write_records(book_prices, json_export_path(BOOK_PRICES_FILE))
+    print(f"Saved {len(plays)} positive EV plays to {OUTPUT_FILE} and {len(book_prices)} book prices to {BOOK_PRICES_FILE}")
 
 if __name__ == "__main__":
     main()
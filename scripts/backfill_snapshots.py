@@ -0,0 +1,88 @@
+import sys
+import json
+import boto3
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from modules.snapshot_store import RUN_FORMAT, S3Store, add_to_manifest, snapshot_frame, write_run_files
+
+# One-off copy of the old per-outcome snapshots (snapshots/<unique_key>/<timestamp>.json) into the
+# per-run Parquet layout under runs/ that line_movement.py writes now. Only objects from the last DAYS
+# days are copied (default 2, the app's HISTORY_TTL_DAYS); the app never reads anything older.
+#   python -m scripts.backfill_snapshots [DAYS]
+# The old job stamped every PUT separately, so one refresh left objects spread over many seconds.
+# Objects are grouped back into refreshes by the gaps between their timestamps: a gap longer than
+# RUN_GAP_SECONDS starts a new run. Each run becomes one file, and each day's manifest is written once.
+# The old objects carry no sport, so backfilled rows are filed under sport=Unknown. The old prefix is
+# left in place and can be deleted once the app has been checked against the backfilled runs.
+BUCKET_NAME = "betversa-odds-data"
+OLD_PREFIX = "snapshots/"
+# The old job ran every 10 minutes and uploaded continuously while it ran.
+RUN_GAP_SECONDS = 120
+
+def old_objects(s3, since):
+    """(timestamp, key) of the old snapshot objects stamped at or after `since`, oldest first."""
+    objects = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=BUCKET_NAME, Prefix=OLD_PREFIX):
+        for obj in page.get("Contents", []):
+            stamp = obj["Key"].rsplit("/", 1)[-1][:-len(".json")]
+            try:
+                timestamp = datetime.strptime(stamp, RUN_FORMAT).replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            if timestamp >= since:
+                objects.append((timestamp, obj["Key"]))
+    return sorted(objects)
+
+def group_runs(objects, gap=RUN_GAP_SECONDS):
+    """Split time-ordered (timestamp, key) pairs into runs; returns {run start time: [key, ...]}."""
+    runs = {}
+    start = previous = None
+    for timestamp, key in objects:
+        if previous is None or (timestamp - previous).total_seconds() > gap:
+            start = timestamp
+            runs[start] = []
+        runs[start].append(key)
+        previous = timestamp
+    return runs
+
+def snapshot_rows(snapshot):
+    details = snapshot.get("bet_details", {})
+    return [{
+        "unique_key": snapshot["unique_key"],
+        "event_id": snapshot.get("event_id"),
+        "sport": None,
+        "market_key": snapshot.get("market_key"),
+        "outcome_name": details.get("outcome_name"),
+        "outcome_description": details.get("outcome_description"),
+        "point": details.get("point"),
+        "bookmaker": odds.get("bookmaker"),
+        "price": odds.get("price"),
+    } for odds in snapshot.get("sportsbook_odds", [])]
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    s3 = boto3.client("s3")
+    store = S3Store(s3, BUCKET_NAME)
+    runs = group_runs(old_objects(s3, datetime.now(timezone.utc) - timedelta(days=days)))
+
+    entries_by_day = defaultdict(list)
+    for run_time, keys in runs.items():
+        # A key uploaded twice within one run keeps its later snapshot.
+        snapshots = {}
+        for key in keys:
+            snapshot = json.loads(s3.get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read())
+            snapshots[snapshot["unique_key"]] = snapshot
+        rows = [row for snapshot in snapshots.values() for row in snapshot_rows(snapshot)]
+        if not rows:
+            continue
+        entries = write_run_files(store, snapshot_frame(rows, run_time), run_time)
+        entries_by_day[run_time.date()].extend(entries)
+        print(f"Backfilled {len(rows)} rows from {len(keys)} objects as run {run_time.strftime(RUN_FORMAT)}")
+
+    # Manifests go last, once per day, so readers never see an entry whose file is not there yet.
+    for day, entries in sorted(entries_by_day.items()):
+        add_to_manifest(store, day, entries)
+        print(f"Recorded {len(entries)} files in the manifest of {day}")
+
+if __name__ == "__main__":
+    main()
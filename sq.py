@@ -1,9 +1,26 @@
 import sqlite3
+import sys
+from modules import odds_history_db
 
-conn = sqlite3.connect("line_movement.db")
-cursor = conn.cursor()
-cursor.execute("SELECT * FROM snapshots")
-rows = cursor.fetchall()
-for row in rows:
-    print(row)
+# Inspect the line-movement history database.
+#   python sq.py                  row counts per sport and the latest run
+#   python sq.py <unique_key>     price history of one play
+#   python sq.py <event_id> <market>   every price recorded for one event market
+try:
+    conn = odds_history_db.connect()
+except sqlite3.OperationalError as e:
+    sys.exit(f"Cannot open {odds_history_db.DB_FILE}: {e}")
+if len(sys.argv) > 2:
+    history = odds_history_db.market_history(conn, sys.argv[1], sys.argv[2])
+    print(history.to_string(index=False))
+elif len(sys.argv) > 1:
+    history = odds_history_db.price_history(conn, unique_key=sys.argv[1])
+    print(history.to_string(index=False))
+else:
+    rows = conn.execute(
+        "SELECT sport, COUNT(*), COUNT(DISTINCT unique_key), datetime(MAX(ts), 'unixepoch') "
+        "FROM outcome_prices GROUP BY sport ORDER BY sport"
+    ).fetchall()
+    for sport, count, keys, latest in rows:
+        print(f"{sport}: {count} prices for {keys} plays, latest run {latest}")
 conn.close()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app is a set of top-level scripts plus the modules/ namespace package, not an installed
+# package; make both importable from the tests.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,85 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+import positiveev
+from modules.ev_engine import process_all_odds_vectorized
+
+BOOKS = ["pinnacle", "fanduel", "draftkings", "betmgm", "espnbet", "williamhill_us", "betonlineag", "lowvig",
+         "betrivers", "hardrockbet"]
+PROP_MARKETS = ["player_points", "batter_hits", "pitcher_strikeouts", "player_shots_on_goal"]
+
+def american(rng, prob):
+    prob = min(max(prob + rng.uniform(-0.03, 0.03), 0.05), 0.95)
+    decimal = 1 / prob
+    return int(round((decimal - 1) * 100)) if decimal >= 2 else int(round(-100 / (decimal - 1)))
+
+def random_slate(seed, n_events=25):
+    """A slate shaped like the odds feed: moneylines, spreads, totals, alternate totals and player props."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    players = [f"Player {c}{i}" for c in "ABCDEFG" for i in range(6)]
+    events = []
+    for e in range(n_events):
+        sport = rng.choice(["NBA", "MLB", "NHL"])
+        home, away = f"Home {e}", f"Away {e}"
+        # Some events have already started and must be skipped by both engines.
+        commence = now + timedelta(hours=rng.choice([-3, -1]) if rng.random() < 0.1 else rng.uniform(2, 72))
+        home_prob = rng.uniform(0.3, 0.7)
+        spread = rng.choice([1.5, 3.5, 5.5])
+        total = rng.choice([6.5, 8.5, 220.5])
+        props = [(rng.choice(players), rng.choice(PROP_MARKETS), rng.choice([0.5, 1.5, 2.5, 24.5])) for _ in range(6)]
+        bookmakers = []
+        for book in BOOKS:
+            if rng.random() < 0.2 and book != "fanduel":
+                continue
+            markets = [{"key": "h2h", "outcomes": [{"name": home, "price": american(rng, home_prob * 1.04)},
+                                                   {"name": away, "price": american(rng, (1 - home_prob) * 1.04)}]}]
+            if rng.random() < 0.8:
+                markets.append({"key": "spreads", "outcomes": [
+                    {"name": home, "price": american(rng, 0.52), "point": -spread},
+                    {"name": away, "price": american(rng, 0.52), "point": spread},
+                ]})
+            markets.append({"key": "totals", "outcomes": [
+                {"name": "Over", "price": american(rng, 0.52), "point": total},
+                {"name": "Under", "price": american(rng, 0.52), "point": total},
+            ]})
+            alternates = []
+            for point in (total - 1, total, total + 1):
+                over = rng.uniform(0.35, 0.65)
+                alternates += [{"name": "Over", "price": american(rng, over * 1.03), "point": point},
+                               {"name": "Under", "price": american(rng, (1 - over) * 1.03), "point": point}]
+            markets.append({"key": "alternate_totals", "outcomes": alternates})
+            for market_key in PROP_MARKETS:
+                outcomes = []
+                for player, prop_market, point in props:
+                    if prop_market != market_key or rng.random() < 0.2:
+                        continue
+                    over = rng.uniform(0.35, 0.65)
+                    outcomes += [{"name": "Over", "description": player, "price": american(rng, over * 1.04), "point": point},
+                                 {"name": "Under", "description": player, "price": american(rng, (1 - over) * 1.04), "point": point}]
+                if outcomes:
+                    markets.append({"key": market_key, "outcomes": outcomes})
+            bookmakers.append({"key": book, "title": book.title(), "markets": markets})
+        events.append({
+            "id": f"ev{e:04d}", "sport_label": sport, "home_team": home, "away_team": away,
+            "commence_time": commence.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "odds": {"bookmakers": bookmakers},
+        })
+    return events
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_engine_matches_scalar(seed):
+    data = random_slate(seed)
+    scalar = positiveev.process_all_odds(data)
+    vectorized = process_all_odds_vectorized(data)
+    assert scalar, "the slate should produce positive-EV plays"
+    # Same plays, same order, and values that serialize identically.
+    assert json.dumps(vectorized) == json.dumps(scalar)
+
+def test_started_events_are_skipped():
+    data = random_slate(0, n_events=3)
+    for event in data:
+        event["commence_time"] = "2000-01-01T00:00:00Z"
+    assert positiveev.process_all_odds(data) == []
+    assert process_all_odds_vectorized(data) == []
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from modules.kelly import american_to_decimal, exclusive_kelly_fractions, kelly_fraction, kelly_stakes
+
+def log_growth(fractions, decimal, prob):
+    """Expected log growth of staking `fractions` on mutually exclusive outcomes (the rest: none wins)."""
+    kept = 1 - fractions.sum()
+    return float(np.sum(prob * np.log(kept + fractions * decimal)) + (1 - prob.sum()) * np.log(kept))
+
+def test_single_bets_match_independent_kelly():
+    odds, prob = [150, -120, 200, -300], [0.45, 0.58, 0.3, 0.7]
+    fractions = exclusive_kelly_fractions(odds, prob, ["a", "b", "c", "d"], ["x", "x", "x", "x"])
+    np.testing.assert_allclose(fractions, kelly_fraction(odds, prob))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_joint_solution_maximizes_log_growth(seed):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(2, 5)
+    prob = rng.dirichlet(np.ones(n + 1))[:n]  # the last share is "none of these outcomes"
+    odds = rng.choice([-250, -150, -110, 100, 120, 180, 250, 400], n)
+    fractions = exclusive_kelly_fractions(odds, prob, ["set"] * n, list(range(n)))
+    decimal = american_to_decimal(odds)
+    best = log_growth(fractions, decimal, prob)
+    for _ in range(2000):
+        candidate = np.clip(fractions + rng.normal(0, 0.02, n), 0, None)
+        if candidate.sum() < 1:
+            assert log_growth(candidate, decimal, prob) <= best + 1e-12
+
+def test_only_the_best_price_on_an_outcome_is_staked():
+    fractions = exclusive_kelly_fractions([110, 125, 115], [0.5, 0.5, 0.5], ["a"] * 3, ["over"] * 3)
+    assert fractions[0] == 0 and fractions[2] == 0
+    assert fractions[1] == pytest.approx(kelly_fraction([125], [0.5])[0])
+
+@pytest.mark.parametrize("odds,prob", [([120, 110], [0.48, 0.5]), ([105, -110], [0.5, 0.49]), ([150, -200], [0.42, 0.58])])
+def test_sides_of_a_line_beat_independent_sizing(odds, prob):
+    decimal, prob = american_to_decimal(odds), np.array(prob)
+    joint = exclusive_kelly_fractions(odds, prob, ["a", "a"], ["over", "under"])
+    independent = kelly_fraction(odds, prob)
+    assert log_growth(joint, decimal, prob) >= log_growth(independent, decimal, prob)
+
+def test_unusable_rows_get_nothing():
+    fractions = exclusive_kelly_fractions([0, None, 150], [0.6, 0.6, float("nan")], ["a", "a", "a"], ["x", "y", "z"])
+    np.testing.assert_array_equal(fractions, [0, 0, 0])
+
+def test_simultaneous_stakes_stay_within_bankroll():
+    odds = [200] * 30
+    stakes = kelly_stakes(odds, [0.5] * 30, 1000, sets=[str(i) for i in range(30)], outcomes=["x"] * 30)
+    assert stakes.sum() == pytest.approx(1000)
+    assert kelly_stakes(odds, [0.5] * 30, 1000).sum() > 1000
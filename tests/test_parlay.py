@@ -0,0 +1,105 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from modules.kelly import american_to_decimal
+from modules.parlay import RANK_EV, RANK_GROWTH, american_to_decimal_bound, best_parlays, parlay_metrics
+
+def random_plays(seed, n=14):
+    rng = np.random.default_rng(seed)
+    odds = rng.choice([-250, -180, -130, -110, 105, 120, 150, 200, 280], n)
+    fair_prob = np.clip(1 / american_to_decimal(odds) + rng.normal(0.02, 0.03, n), 0.05, 0.95)
+    return pd.DataFrame({
+        "Odds": odds,
+        "fair_prob": fair_prob,
+        "event": rng.choice(["e1", "e2", "e3", "e4", "e5", "e6"], n),
+        "Market": rng.choice(["h2h", "totals", "spreads"], n),
+        "Book": rng.choice(["fanduel", "draftkings"], n),
+    })
+
+def brute_force(plays, legs, rank_by=RANK_EV, one_per="event", same_book=True, min_odds=None, max_odds=None):
+    """Metrics of every allowed parlay, best first by `rank_by`."""
+    decimal = american_to_decimal(plays["Odds"])
+    prob = plays["fair_prob"].to_numpy()
+    group_columns = ["event"] if one_per == "event" else ["event", "Market"]
+    groups = [tuple(row) for row in plays[group_columns].to_numpy()]
+    books = plays["Book"].to_numpy()
+    max_decimal, min_decimal = american_to_decimal_bound(max_odds), american_to_decimal_bound(min_odds)
+    results = []
+    for rows in itertools.combinations(range(len(plays)), legs):
+        if len({groups[i] for i in rows}) < legs:
+            continue
+        if same_book and len({books[i] for i in rows}) > 1:
+            continue
+        log_d, log_p = np.log(decimal[list(rows)]).sum(), np.log(prob[list(rows)]).sum()
+        if (max_decimal and np.exp(log_d) > max_decimal) or (min_decimal and np.exp(log_d) < min_decimal):
+            continue
+        ev, _, growth = parlay_metrics(np.array([log_d]), np.array([log_p]))
+        results.append((list(rows), float(growth[0] if rank_by == RANK_GROWTH else ev[0])))
+    return sorted(results, key=lambda result: -result[1])
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("legs", [2, 3])
+@pytest.mark.parametrize("rank_by", [RANK_EV, RANK_GROWTH])
+@pytest.mark.parametrize("one_per,same_book", [("event", True), ("market", False)])
+def test_matches_brute_force(seed, legs, rank_by, one_per, same_book):
+    plays = random_plays(seed)
+    expected = brute_force(plays, legs, rank_by, one_per, same_book)[:5]
+    # A beam wider than the number of partial parlays makes the search exhaustive.
+    found = best_parlays(plays, legs, top_k=5, rank_by=rank_by, one_per=one_per, same_book=same_book,
+                         beam_width=10_000)
+    key = "growth" if rank_by == RANK_GROWTH else "ev"
+    np.testing.assert_allclose([parlay[key] for parlay in found], [score for _, score in expected])
+    assert sorted(found[0]["rows"]) == expected[0][0]
+
+@pytest.mark.parametrize("min_odds,max_odds", [(300, None), (None, 400), (250, 600)])
+def test_odds_bounds(min_odds, max_odds):
+    plays = random_plays(11)
+    expected = brute_force(plays, 2, min_odds=min_odds, max_odds=max_odds)[:3]
+    found = best_parlays(plays, 2, top_k=3, min_odds=min_odds, max_odds=max_odds, beam_width=10_000)
+    np.testing.assert_allclose([parlay["ev"] for parlay in found], [score for _, score in expected])
+
+def test_default_beam_keeps_the_best_parlay():
+    plays = random_plays(3, n=40)
+    expected = brute_force(plays, 3, same_book=False)
+    found = best_parlays(plays, 3, top_k=1, same_book=False)
+    assert found[0]["ev"] == pytest.approx(expected[0][1])
+
+def test_legs_respect_one_per_event():
+    plays = random_plays(5, n=30)
+    for parlay in best_parlays(plays, 3, top_k=5, same_book=False):
+        assert plays["event"].iloc[parlay["rows"]].nunique() == 3
+
+@pytest.mark.parametrize("bound", [0, 50, -99])
+def test_sub_100_bounds_are_ignored(bound):
+    plays = random_plays(2)
+    unbounded = best_parlays(plays, 2, top_k=3)
+    assert best_parlays(plays, 2, top_k=3, min_odds=bound, max_odds=bound) == unbounded
+
+def test_too_few_plays():
+    assert best_parlays(random_plays(0).head(0), 2) == []
+
+def test_min_odds_with_the_default_beam():
+    # Many strong short-priced legs fill a narrow beam with partial parlays that can never reach the
+    # minimum; the qualifying parlays need two of the few long legs.
+    plays = pd.DataFrame({
+        "Odds": [-300] * 60 + [300] * 6,
+        "fair_prob": [0.8] * 60 + [0.26] * 6,
+        "event": [f"e{i}" for i in range(66)],
+        "Market": "h2h",
+        "Book": "fanduel",
+    })
+    expected = brute_force(plays, 3, min_odds=2000)
+    found = best_parlays(plays, 3, top_k=3, min_odds=2000)
+    assert len(found) == 3
+    assert found[0]["ev"] == pytest.approx(expected[0][1])
+    assert all(parlay["decimal"] >= 21 for parlay in found)
+
+def test_min_odds_with_the_default_beam_on_random_slates():
+    for seed in range(5):
+        plays = random_plays(seed, n=40)
+        expected = brute_force(plays, 3, same_book=False, min_odds=800)
+        found = best_parlays(plays, 3, top_k=1, same_book=False, min_odds=800)
+        assert bool(found) == bool(expected)
+        if expected:
+            assert found[0]["ev"] == pytest.approx(expected[0][1])
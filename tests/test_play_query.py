@@ -0,0 +1,47 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from modules.play_query import ALL, PlayQuery, page, page_count
+
+@pytest.fixture
+def plays():
+    rng = np.random.default_rng(7)
+    n = 500
+    df = pd.DataFrame({
+        "Sport": rng.choice(["NBA", "MLB", "NHL"], n),
+        "Book": rng.choice(["fanduel", "draftkings", "betmgm", "espnbet"], n),
+        "Market": rng.choice(["h2h", "totals", "player_points", "batter_hits", None], n),
+        "EV": rng.normal(2, 1, n),
+    })
+    return df.astype({"Sport": "category", "Book": "category", "Market": "category"})
+
+def test_positions_match_boolean_masks(plays):
+    query = PlayQuery(plays)
+    choices = [[ALL] + query.options[column] for column in ("Sport", "Book", "Market")]
+    for values in itertools.product(*choices):
+        mask = np.ones(len(plays), dtype=bool)
+        for column, value in zip(("Sport", "Book", "Market"), values):
+            if value != ALL:
+                mask &= (plays[column] == value).to_numpy()
+        np.testing.assert_array_equal(query.positions(*values), np.flatnonzero(mask))
+
+def test_all_wildcards_select_every_row(plays):
+    query = PlayQuery(plays)
+    pd.testing.assert_frame_equal(query.select(ALL, ALL, ALL), plays)
+
+def test_unknown_value_selects_nothing(plays):
+    query = PlayQuery(plays)
+    assert len(query.positions("NFL", ALL, ALL)) == 0
+    assert query.select("NFL", ALL, ALL).empty
+
+def test_options_skip_missing_values(plays):
+    assert PlayQuery(plays).options["Market"] == ["batter_hits", "h2h", "player_points", "totals"]
+
+def test_paging(plays):
+    assert page_count(0) == 1
+    assert page_count(250, 100) == 3
+    assert page_count(300, 100) == 3
+    assert len(page(plays, 5, 100)) == 100
+    pd.testing.assert_frame_equal(page(plays, 2, 50), plays.iloc[50:100])
+    assert page(plays, 6, 100).empty